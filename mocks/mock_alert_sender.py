@@ -1,39 +1,117 @@
-import datetime
+import asyncio
+import logging
+from mocks.mock_utils import get_console_logger, now_iso
+
+logger = logging.getLogger(__name__)
+_console = get_console_logger("mock_alert")
 
 class MockAlertSenderService:
     """
     A mock service for sending internal alerts.
 
-    This service simulates an alert notification system by logging alert messages
-    to a specified output file and printing them to the console.
+    This service simulates an alert notification system by recording alert messages
+    in memory and, when persisting, in a specified output file, and echoing them to
+    the console through a queue-backed logger. Persisted alerts are queued
+    and written by a background task that batches every pending message into a
+    single write on a persistent file handle.
     """
-    def __init__(self, output_file='logs/internal_alert_log.txt'): # Changed path
+    __slots__ = ("output_file", "persist", "alerts", "_fh", "_queue", "_writer", "_loop")
+
+    def __init__(self, output_file='logs/internal_alert_log.txt', persist: bool = True): # Changed path
         """
         Initializes the MockAlertSenderService.
 
+        Opens the alert log once for appending; the handle stays open for the
+        lifetime of the service.
+
         Args:
             output_file (str): The path to the file where alerts will be logged.
                                Defaults to 'logs/internal_alert_log.txt'.
+            persist (bool): Whether alerts are written to the output file. Defaults to True.
         """
         self.output_file = output_file
+        self.persist = persist
+        self.alerts = [] # Formatted alert lines, oldest first
+        self._fh = open(self.output_file, 'a', encoding='utf-8', buffering=1 << 16) if persist else None
+        self._queue = None
+        self._writer = None
+        self._loop = None
         print(f"[MOCK ALERT] Initialized. Internal alerts will be logged to '{self.output_file}'.")
 
-    def send_alert(self, message: str, channel: str = "#general"):
+    async def send_alert(self, message: str, channel: str = "#general"):
         """
         Simulates sending an alert.
 
-        Logs the alert message with a timestamp and channel to the configured
-        output file and prints it to the console.
+        Formats the alert message with a timestamp and channel, records it in
+        `alerts`, logs it to the console and, when persisting, queues it for the
+        background writer. Call `flush` to wait until queued alerts have reached
+        the output file.
 
         Args:
             message (str): The content of the alert message.
             channel (str): The channel to which the alert is sent (e.g., "#general").
                            Defaults to "#general".
         """
-        timestamp = datetime.datetime.now().isoformat()
-        alert_message = f"[{timestamp}] [MOCK ALERT - {channel}] {message}"
-        print(alert_message)
-        with open(self.output_file, 'a') as f:
-            f.write(alert_message + "\n")
-        print(f"[MOCK ALERT] Alert logged to {self.output_file}.")
+        alert_message = f"[{now_iso()}] [MOCK ALERT - {channel}] {message}"
+        _console.info(alert_message)
+        self.alerts.append(alert_message)
+        if not self.persist:
+            return
+        self._ensure_writer()
+        self._queue.put_nowait(alert_message + "\n")
+
+    async def flush(self):
+        """
+        Waits until every queued alert has been written to the output file.
+        """
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+    async def aclose(self):
+        """
+        Flushes pending alerts, stops the background writer and closes the log file.
+        """
+        await self.flush()
+        if self._writer is not None:
+            self._writer.cancel()
+            self._writer = None
+        if self._fh is not None:
+            self._fh.close()
+
+    def _ensure_writer(self):
+        """
+        Starts the background writer on the running event loop if it is not already running there.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._writer is None or self._writer.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._writer = loop.create_task(self._drain())
+
+    async def _drain(self):
+        """
+        Background task that writes queued alerts, batching everything pending into one write.
+
+        A failed write is logged and its batch dropped; the task keeps draining the queue.
+        """
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await asyncio.to_thread(self._write_batch, "".join(batch))
+            except Exception:
+                logger.exception("[MOCK ALERT] Failed to write %d alert(s) to '%s'.", len(batch), self.output_file)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, lines: str):
+        """
+        Writes a batch of newline-terminated alert lines and flushes the file buffer.
 
+        Args:
+            lines (str): The concatenated alert lines to write.
+        """
+        self._fh.write(lines)
+        self._fh.flush()
@@ -1,29 +1,40 @@
-import datetime # Added import for datetime
+import asyncio
+from mocks.mock_utils import get_console_logger, now_iso
+
+_console = get_console_logger("mock_email")
 
 class MockEmailSenderService:
     """
     A mock service for sending emails.
 
-    This service simulates sending emails by logging the email details (recipient,
-    subject, body) to a specified output file, mimicking an auto-reply sample.
+    This service simulates sending emails by recording the email details (recipient,
+    subject, body) in memory and, when persisting, in a specified output file,
+    mimicking an auto-reply sample.
     """
-    def __init__(self, output_file='data/auto_reply_sample.txt'): # Changed path
+    __slots__ = ("output_file", "persist", "sent_emails")
+
+    def __init__(self, output_file='data/auto_reply_sample.txt', persist: bool = True): # Changed path
         """
         Initializes the MockEmailSenderService.
 
         Args:
             output_file (str): The path to the file where email samples will be saved.
                                Defaults to 'data/auto_reply_sample.txt'.
+            persist (bool): Whether email samples are written to the output file. Defaults to True.
         """
         self.output_file = output_file
+        self.persist = persist
+        self.sent_emails = [] # One {'recipient', 'subject', 'body', 'is_html'} dict per email sent
         print(f"[MOCK EMAIL] Initialized. Auto-reply samples will be saved to '{self.output_file}'.")
 
-    def send_email(self, recipient: str, subject: str, body: str, is_html: bool = False):
+    async def send_email(self, recipient: str, subject: str, body: str, is_html: bool = False):
         """
         Simulates sending an email.
 
-        Logs the email's recipient, subject, body, and content type to the
-        configured output file and prints details to the console.
+        Records the email's recipient, subject, body, and content type in `sent_emails`
+        and, when persisting, in the configured output file, and logs the details to
+        the console through a queue-backed logger. The file write runs in a worker
+        thread so it does not block the event loop.
 
         Args:
             recipient (str): The email address of the recipient.
@@ -32,15 +43,30 @@ class MockEmailSenderService:
             is_html (bool): True if the email body is HTML, False otherwise (plain text).
                             Defaults to False.
         """
-        print(f"[MOCK EMAIL] Sending email to: {recipient}")
-        print(f"[MOCK EMAIL] Subject: {subject}")
-        print(f"[MOCK EMAIL] Body:\n---\n{body}\n---")
-
-        with open(self.output_file, 'a') as f:
-            f.write(f"--- NEW AUTO-REPLY ({datetime.datetime.now().isoformat()}) ---\n")
-            f.write(f"To: {recipient}\n")
-            f.write(f"Subject: {subject}\n")
-            f.write(f"Content-Type: {'text/html' if is_html else 'text/plain'}\n")
-            f.write(f"Body:\n{body}\n\n")
-        print(f"[MOCK EMAIL] Auto-reply sample saved to {self.output_file}.")
+        _console.info(
+            "[MOCK EMAIL] Sending email to: %s\n[MOCK EMAIL] Subject: %s\n[MOCK EMAIL] Body:\n---\n%s\n---",
+            recipient, subject, body,
+        )
+        self.sent_emails.append({'recipient': recipient, 'subject': subject, 'body': body, 'is_html': is_html})
+        if not self.persist:
+            return
+
+        sample = (
+            f"--- NEW AUTO-REPLY ({now_iso()}) ---\n"
+            f"To: {recipient}\n"
+            f"Subject: {subject}\n"
+            f"Content-Type: {'text/html' if is_html else 'text/plain'}\n"
+            f"Body:\n{body}\n\n"
+        )
+        await asyncio.to_thread(self._append_sample, sample)
+
+    def _append_sample(self, sample: str):
+        """
+        Appends a formatted email sample to the output file.
+
+        Args:
+            sample (str): The formatted email sample to append.
+        """
+        with open(self.output_file, 'a', encoding='utf-8') as f:
+            f.write(sample)
 
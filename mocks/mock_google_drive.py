@@ -1,5 +1,6 @@
 import os
 import shutil
+from typing import BinaryIO, Union
 
 class MockGoogleDriveService:
     """
@@ -8,7 +9,9 @@ class MockGoogleDriveService:
     This service simulates archiving attachments to a local folder structure,
     mimicking Google Drive's behavior for testing purposes.
     """
-    def __init__(self, drive_folder_path='mock_drive_folder'):
+    __slots__ = ("drive_folder_path", "persist", "files")
+
+    def __init__(self, drive_folder_path='mock_drive_folder', persist: bool = True):
         """
         Initializes the MockGoogleDriveService.
 
@@ -18,21 +21,28 @@ class MockGoogleDriveService:
             drive_folder_path (str): The path to the local directory that will
                                      simulate the Google Drive folder.
                                      Defaults to 'mock_drive_folder'.
+            persist (bool): Whether attachments are written to the mock drive folder.
+                            Defaults to True; otherwise they are kept in `files`.
         """
         self.drive_folder_path = drive_folder_path
-        os.makedirs(self.drive_folder_path, exist_ok=True)
+        self.persist = persist
+        self.files = {} # Archived content by destination path, when not persisting
+        if persist:
+            os.makedirs(self.drive_folder_path, exist_ok=True)
         print(f"[MOCK DRIVE] Initialized. Mock drive folder: {self.drive_folder_path}")
 
-    def archive_attachment(self, file_name: str, file_content: bytes, target_folder_name: str = "RFQ_Attachments") -> str:
+    def archive_attachment(self, file_name: str, file_content: Union[bytes, BinaryIO], target_folder_name: str = "RFQ_Attachments") -> str:
         """
         Simulates archiving an attachment to a specified folder within the mock drive.
 
         Creates the target folder if it doesn't exist and writes the file content
-        to a new file within that folder.
+        to a new file within that folder. File-like content is copied in chunks.
+        Without `persist`, the content is stored in `files` under the same path instead.
 
         Args:
             file_name (str): The name of the file to archive.
-            file_content (bytes): The binary content of the file.
+            file_content (Union[bytes, BinaryIO]): The binary content of the file,
+                                                   or a readable binary stream of it.
             target_folder_name (str): The name of the subfolder within the
                                       mock drive to save the attachment.
                                       Defaults to "RFQ_Attachments".
@@ -41,11 +51,19 @@ class MockGoogleDriveService:
             str: The full path where the attachment was saved.
         """
         target_path = os.path.join(self.drive_folder_path, target_folder_name)
-        os.makedirs(target_path, exist_ok=True)
-        
         destination_path = os.path.join(target_path, file_name)
+        if not self.persist:
+            if not isinstance(file_content, (bytes, bytearray, memoryview)):
+                file_content = file_content.read()
+            self.files[destination_path] = bytes(file_content)
+            return destination_path
+
+        os.makedirs(target_path, exist_ok=True)
         with open(destination_path, 'wb') as f:
-            f.write(file_content)
+            if isinstance(file_content, (bytes, bytearray, memoryview)):
+                f.write(file_content)
+            else:
+                shutil.copyfileobj(file_content, f)
         print(f"[MOCK DRIVE] Archived attachment '{file_name}' to '{destination_path}'.")
         return destination_path
 
@@ -1,47 +1,141 @@
-import json
+import asyncio
+import logging
 import os
+from typing import Any, Dict, Iterator, List
+from mocks.mock_utils import json_dumps_line, read_jsonl
+
+logger = logging.getLogger(__name__)
+
+# Placeholder for the cells of a column that a row did not set
+_MISSING = object()
 
 class MockGoogleSheetsService:
     """
     A mock service for interacting with Google Sheets.
 
     This service simulates appending rows to a Google Sheet by storing data
-    in a local JSON file.
+    in memory and, when persisting, in a local JSON Lines file, one row per line.
+    In memory, the sheet is kept column by column, like a spreadsheet: `columns`
+    maps each header to the list of its cell values, one per row.
     """
-    def __init__(self, output_file='logs/mock_sheets_log.json'): # Changed path
+    __slots__ = ("output_file", "columns", "num_rows", "flush_every", "fsync", "persist", "_fh", "_pending")
+
+    def __init__(self, output_file='logs/mock_sheets_log.jsonl', flush_every: int = 32, fsync: bool = False, persist: bool = True): # Changed path
         """
         Initializes the MockGoogleSheetsService.
 
-        Loads existing data from the output JSON file if it exists and is valid.
+        Loads existing rows from the output JSON Lines file if it exists and opens
+        the file for appending. New rows are kept in memory and written in batches.
+        Without `persist`, rows are only kept in memory and the file is never touched.
 
         Args:
-            output_file (str): The path to the JSON file where sheet data will be logged.
-                               Defaults to 'logs/mock_sheets_log.json'.
+            output_file (str): The path to the JSON Lines file where sheet data will be logged.
+                               Defaults to 'logs/mock_sheets_log.jsonl'.
+            flush_every (int): The number of buffered records that triggers a write to disk.
+                               Defaults to 32; call `flush` to write earlier.
+            fsync (bool): Whether every batch write is also forced to stable storage with
+                          `os.fsync`. Defaults to False, leaving write-back to the OS.
+            persist (bool): Whether rows are written to the output file. Defaults to True.
         """
         self.output_file = output_file
-        self.data = []
-        if os.path.exists(self.output_file):
-            try:
-                with open(self.output_file, 'r') as f:
-                    self.data = json.load(f)
-            except json.JSONDecodeError:
-                self.data = [] # Handle empty or malformed JSON
-        print(f"[MOCK SHEETS] Initialized with {len(self.data)} existing entries.")
+        self.columns: Dict[str, List[Any]] = {}
+        self.num_rows = 0
+        if persist and os.path.exists(self.output_file):
+            for row in read_jsonl(self.output_file):
+                self._add_to_columns(row)
+        self.flush_every = flush_every
+        self.fsync = fsync
+        self.persist = persist
+        self._fh = open(self.output_file, 'ab', buffering=1 << 16) if persist else None
+        self._pending = []
+        print(f"[MOCK SHEETS] Initialized with {self.num_rows} existing entries.")
 
-    def append_row(self, row_data: dict):
+    async def append_row(self, row_data: dict):
         """
         Simulates appending a new row of data to a Google Sheet.
 
-        The `row_data` dictionary is appended to the internal list of data and
-        then saved back to the configured JSON output file.
+        The `row_data` values are appended to their columns and the row is
+        buffered as a single JSON line; buffered rows are appended to the output
+        file in batches of `flush_every`, so the request path rarely touches disk
+        and earlier rows are never rewritten.
 
         Args:
             row_data (dict): A dictionary representing the row to be appended.
                              Keys are column headers, values are cell contents.
         """
-        print(f"[MOCK SHEETS] Appending row: {row_data}")
-        self.data.append(row_data)
-        with open(self.output_file, 'w') as f:
-            json.dump(self.data, f, indent=4)
-        print(f"[MOCK SHEETS] Row saved to {self.output_file}.")
+        logger.debug("[MOCK SHEETS] Appending row: %r", row_data)
+        self._add_to_columns(row_data)
+        if not self.persist:
+            return
+        self._pending.append(json_dumps_line(row_data))
+        if len(self._pending) >= self.flush_every:
+            await self.flush()
+        logger.debug("[MOCK SHEETS] Row queued for %s.", self.output_file)
 
+    @property
+    def data(self) -> List[Dict[str, Any]]:
+        """
+        All rows as dictionaries, oldest first. Each access rebuilds the list from the columns;
+        use `columns` or `to_rows` for cheaper access.
+        """
+        return list(self.to_rows())
+
+    def to_rows(self) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yields each row as a dictionary of the cells it set, oldest first.
+
+        Yields:
+            Dict[str, Any]: One row, keyed by column header.
+        """
+        columns = list(self.columns.items())
+        for i in range(self.num_rows):
+            yield {header: cells[i] for header, cells in columns if cells[i] is not _MISSING}
+
+    def _add_to_columns(self, row_data: dict):
+        """
+        Appends one row's cells to their columns, keeping every column `num_rows` long.
+
+        Args:
+            row_data (dict): The row, keyed by column header.
+        """
+        for header, value in row_data.items():
+            cells = self.columns.get(header)
+            if cells is None:
+                # A new header: earlier rows have no cell in this column
+                cells = self.columns[header] = [_MISSING] * self.num_rows
+            cells.append(value)
+        self.num_rows += 1
+        if len(row_data) < len(self.columns):
+            for cells in self.columns.values():
+                if len(cells) < self.num_rows:
+                    cells.append(_MISSING)
+
+    async def flush(self):
+        """
+        Writes every buffered row to the output file from a worker thread.
+        """
+        if self._pending:
+            lines, self._pending = b"".join(self._pending), []
+            await asyncio.to_thread(self._write_lines, lines)
+
+    def close(self):
+        """
+        Writes any buffered rows and closes the output file handle.
+        """
+        if self._pending:
+            self._write_lines(b"".join(self._pending))
+            self._pending = []
+        if self._fh is not None:
+            self._fh.close()
+
+    def _write_lines(self, lines: bytes):
+        """
+        Appends a batch of JSON lines to the output file and flushes the file buffer.
+
+        Args:
+            lines (bytes): The concatenated, newline-terminated JSON records.
+        """
+        self._fh.write(lines)
+        self._fh.flush()
+        if self.fsync:
+            os.fsync(self._fh.fileno())
@@ -1,7 +1,57 @@
 import json
+import logging
 import re
 from typing import Dict, Any
 
+logger = logging.getLogger(__name__)
+
+# Field extraction patterns, compiled once at import instead of on every extract_fields call
+_PAT_PRODUCT = re.compile(r'quote \d+ pcs (.*?)(?:\. Needed in|\n)', re.IGNORECASE)
+_PAT_QUANTITY = re.compile(r'quote (\d+ pcs)', re.IGNORECASE)
+_PAT_LOCATION = re.compile(r'Needed in (\w+) within', re.IGNORECASE)
+_PAT_DELIVERY = re.compile(r'within (\d+ weeks)', re.IGNORECASE)
+# Contact person appears after "Regards," and before the phone/email
+_PAT_CONTACT_NAME = re.compile(r'Regards,\s*(.*?)(?:,\s*\+9665|\s*,\s*\S+@\S+\.\S+|\n|$)', re.IGNORECASE)
+_PAT_CONTACT_EMAIL = re.compile(r'(\S+@\S+\.\S+)')
+_PAT_CONTACT_PHONE = re.compile(r'\+9665(\d{8})') # Assuming 8 digits after +9665
+
+# --- Email Draft Templates ---
+# Values used when the summary data omits a field
+_DRAFT_DEFAULTS = {
+    "client_name": "Client",
+    "currency": "CUR",
+    "grand_total": 0.0,
+    "delivery_terms": "Not specified",
+    "notes": "No specific notes.",
+}
+
+_EN_DRAFT_TEMPLATE = (
+    "Mock LLM response for English:\n\n"
+    "Dear {client_name},\n\n"
+    "Please find below the summary of your quotation:\n"
+    "Grand Total: {grand_total:.2f} {currency}\n"
+    "Delivery Terms: {delivery_terms}\n"
+    "Notes: {notes}\n\n"
+    "We look forward to your business.\n"
+    "Sincerely,\n"
+    "Quotation Team"
+)
+
+_AR_DRAFT_TEMPLATE = (
+    "استجابة نموذج اللغة الكبيرة الوهمية للغة العربية:\n\n"
+    "عزيزي {client_name},\n\n"
+    "تجدون أدناه ملخص عرض الأسعار الخاص بكم:\n"
+    "الإجمالي الكلي: {grand_total:.2f} {currency}\n"
+    "شروط التسليم: {delivery_terms}\n"
+    "ملاحظات خاصة: {notes}\n\n"
+    "نتطلع إلى عملكم معنا.\n"
+    "مع خالص التقدير،\n"
+    "فريق عروض الأسعار"
+)
+
+# Both parts combined into a single bilingual draft with a clear separator
+_BILINGUAL_DRAFT_TEMPLATE = f"{_EN_DRAFT_TEMPLATE}\n\n---\n\n{_AR_DRAFT_TEMPLATE}"
+
 class MockLLMService:
     """
     A mock service simulating a Large Language Model (LLM) for text extraction and generation.
@@ -9,6 +59,8 @@ class MockLLMService:
     This service provides predefined or simple regex-based responses for extracting fields
     from text and generating mock email drafts.
     """
+    __slots__ = ("mock_responses",)
+
     def __init__(self):
         """
         Initializes the MockLLMService with predefined mock responses.
@@ -41,17 +93,15 @@ class MockLLMService:
             Dict[str, Any]: A dictionary containing extracted fields like product,
                             quantity, location, contact info, etc.
         """
-        print(f"[MOCK LLM] Extracting fields for subject: '{subject}'")
+        logger.debug("[MOCK LLM] Extracting fields for subject: '%s'", subject)
         if "RFQ — Streetlight Poles" in subject:
-            # Updated regex patterns for more accurate extraction
-            product_match = re.search(r'quote \d+ pcs (.*?)(?:\. Needed in|\n)', body, re.IGNORECASE)
-            quantity_match = re.search(r'quote (\d+ pcs)', body, re.IGNORECASE)
-            location_match = re.search(r'Needed in (\w+) within', body, re.IGNORECASE)
-            delivery_match = re.search(r'within (\d+ weeks)', body, re.IGNORECASE)
-            # Improved regex for contact person, looking before email/phone
-            contact_name_match = re.search(r'Regards,\s*(.*?)(?:,\s*\+9665|\s*,\s*\S+@\S+\.\S+|\n|$)', body, re.IGNORECASE)
-            contact_email_match = re.search(r'(\S+@\S+\.\S+)', body)
-            contact_phone_match = re.search(r'\+9665(\d{8})', body) # Assuming 8 digits after +9665
+            product_match = _PAT_PRODUCT.search(body)
+            quantity_match = _PAT_QUANTITY.search(body)
+            location_match = _PAT_LOCATION.search(body)
+            delivery_match = _PAT_DELIVERY.search(body)
+            contact_name_match = _PAT_CONTACT_NAME.search(body)
+            contact_email_match = _PAT_CONTACT_EMAIL.search(body)
+            contact_phone_match = _PAT_CONTACT_PHONE.search(body)
 
             return {
                 "product": product_match.group(1).strip() if product_match else "N/A",
@@ -63,7 +113,7 @@ class MockLLMService:
                 "contact_phone": contact_phone_match.group(0) if contact_phone_match else "N/A" # Keep full matched phone for clarity
             }
         
-        print("[MOCK LLM] No specific mock response found for this subject. Returning empty dict.")
+        logger.debug("[MOCK LLM] No specific mock response found for this subject. Returning empty dict.")
         return {
             "product": "N/A",
             "quantity": "N/A",
@@ -74,62 +124,25 @@ class MockLLMService:
             "contact_phone": "N/A"
         }
 
-    def generate_response(self, prompt: str) -> str:
+    def generate_response_from_data(self, lang: str, summary_data: Dict[str, Any]) -> str:
         """
-        Generates a mock response based on the prompt, simulating an LLM email draft.
+        Generates a mock email draft directly from the quotation summary data, simulating an LLM.
         This version always generates a single, combined bilingual (English and Arabic) draft.
 
-        It parses key information (client name, grand total, delivery terms, notes)
-        from the prompt to construct a semi-realistic, formatted email draft.
+        The summary values are formatted straight into the bilingual template, so there is
+        no need to render a prompt and parse the same values back out of it.
 
         Args:
-            prompt (str): The prompt text used to guide the LLM's response generation.
+            lang (str): The language requested by the caller. The mock always answers bilingually.
+            summary_data (Dict[str, Any]): The quotation summary, e.g. client_name, currency,
+                                           grand_total, delivery_terms, notes.
 
         Returns:
             str: A combined bilingual (English and Arabic) mock email draft.
         """
-        print(f"[MOCK LLM] Generating mock bilingual response for prompt:\n---\n{prompt}\n---")
-
-        # Extract summary data from prompt for more realistic mock
-        client_name_match = re.search(r'The client is (.*?)\.', prompt)
-        client_name = client_name_match.group(1) if client_name_match else "Client"
-
-        grand_total_match = re.search(r'The grand total is (\d+\.\d{2} \w+)\.', prompt)
-        grand_total = grand_total_match.group(1) if grand_total_match else "0.00 CUR"
-
-        delivery_terms_match = re.search(r'Delivery terms: (.*?)\.', prompt)
-        delivery_terms = delivery_terms_match.group(1) if delivery_terms_match else "Not specified"
-
-        notes_match = re.search(r'Special notes: (.*?)(?:\n|$)', prompt, re.DOTALL)
-        notes = notes_match.group(1).strip() if notes_match else "No specific notes."
-
-        # Construct the mock response with both English and Arabic content
-        english_part = (
-            f"Mock LLM response for English:\n\n"
-            f"Dear {client_name},\n\n"
-            f"Please find below the summary of your quotation:\n"
-            f"Grand Total: {grand_total}\n"
-            f"Delivery Terms: {delivery_terms}\n"
-            f"Notes: {notes}\n\n"
-            f"We look forward to your business.\n"
-            f"Sincerely,\n"
-            f"Quotation Team"
-        )
-
-        arabic_part = (
-            f"استجابة نموذج اللغة الكبيرة الوهمية للغة العربية:\n\n"
-            f"عزيزي {client_name},\n\n"
-            f"تجدون أدناه ملخص عرض الأسعار الخاص بكم:\n"
-            f"الإجمالي الكلي: {grand_total}\n"
-            f"شروط التسليم: {delivery_terms}\n"
-            f"ملاحظات خاصة: {notes}\n\n"
-            f"نتطلع إلى عملكم معنا.\n"
-            f"مع خالص التقدير،\n"
-            f"فريق عروض الأسعار"
-        )
-
-        # Combine both into a single bilingual draft with a clear separator
-        bilingual_draft = f"{english_part}\n\n---\n\n{arabic_part}"
-
-        return bilingual_draft
-
+        logger.debug("[MOCK LLM] Generating mock bilingual response for language: '%s'", lang)
+        # Empty values (e.g. notes="") fall back to the defaults as well as missing ones
+        fields = {**_DRAFT_DEFAULTS, **{key: value for key, value in summary_data.items() if value or value == 0}}
+        # A trailing period in the name (e.g. "Gulf Eng.") would clash with the greeting's comma
+        fields["client_name"] = str(fields["client_name"]).rstrip(".")
+        return _BILINGUAL_DRAFT_TEMPLATE.format_map(fields)
@@ -1,40 +1,55 @@
-import json
+import asyncio
+import logging
 import os
+from mocks.mock_utils import json_dumps_line, read_jsonl, now_iso
 import datetime
 
+logger = logging.getLogger(__name__)
+
 class MockSalesforceCRMService:
     """
     A mock service for interacting with Salesforce CRM functionalities.
 
     This service simulates creating and logging CRM opportunities by storing data
-    in a local JSON file.
+    in memory and, when persisting, in a local JSON Lines file, one opportunity per line.
     """
-    def __init__(self, output_file='logs/crm_mock_log.json'): # Changed path
+    __slots__ = ("output_file", "opportunities", "flush_every", "fsync", "persist", "_fh", "_pending")
+
+    def __init__(self, output_file='logs/crm_mock_log.jsonl', flush_every: int = 32, fsync: bool = False, persist: bool = True): # Changed path
         """
         Initializes the MockSalesforceCRMService.
 
-        Loads existing opportunities from the output JSON file if it exists and is valid.
+        Loads existing opportunities from the output JSON Lines file if it exists and
+        opens the file for appending. New opportunities are kept in memory and written
+        in batches. Without `persist`, opportunities are only kept in memory and the file
+        is never touched.
 
         Args:
-            output_file (str): The path to the JSON file where CRM opportunities
-                               will be logged. Defaults to 'logs/crm_mock_log.json'.
+            output_file (str): The path to the JSON Lines file where CRM opportunities
+                               will be logged. Defaults to 'logs/crm_mock_log.jsonl'.
+            flush_every (int): The number of buffered records that triggers a write to disk.
+                               Defaults to 32; call `flush` to write earlier.
+            fsync (bool): Whether every batch write is also forced to stable storage with
+                          `os.fsync`. Defaults to False, leaving write-back to the OS.
+            persist (bool): Whether opportunities are written to the output file. Defaults to True.
         """
         self.output_file = output_file
-        self.opportunities = []
-        if os.path.exists(self.output_file):
-            try:
-                with open(self.output_file, 'r') as f:
-                    self.opportunities = json.load(f)
-            except json.JSONDecodeError:
-                self.opportunities = [] # Handle empty or malformed JSON
+        self.opportunities = read_jsonl(self.output_file) if persist and os.path.exists(self.output_file) else []
+        self.flush_every = flush_every
+        self.fsync = fsync
+        self.persist = persist
+        self._fh = open(self.output_file, 'ab', buffering=1 << 16) if persist else None
+        self._pending = []
         print(f"[MOCK SALESFORCE] Initialized with {len(self.opportunities)} existing opportunities.")
 
-    def create_opportunity(self, opportunity_data: dict) -> dict:
+    async def create_opportunity(self, opportunity_data: dict) -> dict:
         """
         Simulates creating a new CRM opportunity in Salesforce.
 
         Generates a mock ID, timestamps, and appends the new opportunity data
-        to the internal list, then saves it to the configured JSON output file.
+        to the internal list, and buffers it as a single JSON line; buffered
+        opportunities are appended to the output file in batches of `flush_every`,
+        and earlier opportunities are never rewritten.
 
         Args:
             opportunity_data (dict): A dictionary containing the data for the
@@ -44,7 +59,7 @@ class MockSalesforceCRMService:
             dict: The newly created opportunity dictionary, including mock ID
                   and timestamps.
         """
-        print(f"[MOCK SALESFORCE] Creating opportunity: {opportunity_data}")
+        logger.debug("[MOCK SALESFORCE] Creating opportunity: %r", opportunity_data)
         # Simulate Salesforce ID and timestamps
         new_opportunity = {
             "Id": f"006xxxxxxxxxxxxxxx{len(self.opportunities) + 1}",
@@ -53,12 +68,44 @@ class MockSalesforceCRMService:
             "CloseDate": opportunity_data.get("CloseDate", datetime.date.today().isoformat()),
             "Amount": opportunity_data.get("Amount"),
             "Description": opportunity_data.get("Description"),
-            "CreatedDate": datetime.datetime.now().isoformat(),
+            "CreatedDate": now_iso(),
             **opportunity_data # Include all provided data
         }
         self.opportunities.append(new_opportunity)
-        with open(self.output_file, 'w') as f:
-            json.dump(self.opportunities, f, indent=4)
-        print(f"[MOCK SALESFORCE] Opportunity '{new_opportunity['Name']}' created and logged to {self.output_file}.")
+        if not self.persist:
+            return new_opportunity
+        self._pending.append(json_dumps_line(new_opportunity))
+        if len(self._pending) >= self.flush_every:
+            await self.flush()
+        logger.debug("[MOCK SALESFORCE] Opportunity '%s' created and queued for %s.", new_opportunity['Name'], self.output_file)
         return new_opportunity
 
+    async def flush(self):
+        """
+        Writes every buffered opportunity to the output file from a worker thread.
+        """
+        if self._pending:
+            lines, self._pending = b"".join(self._pending), []
+            await asyncio.to_thread(self._write_lines, lines)
+
+    def close(self):
+        """
+        Writes any buffered opportunities and closes the output file handle.
+        """
+        if self._pending:
+            self._write_lines(b"".join(self._pending))
+            self._pending = []
+        if self._fh is not None:
+            self._fh.close()
+
+    def _write_lines(self, lines: bytes):
+        """
+        Appends a batch of JSON lines to the output file and flushes the file buffer.
+
+        Args:
+            lines (bytes): The concatenated, newline-terminated JSON records.
+        """
+        self._fh.write(lines)
+        self._fh.flush()
+        if self.fsync:
+            os.fsync(self._fh.fileno())
@@ -0,0 +1,135 @@
+"""
+Shared helpers for the mock services.
+
+Provides JSON and JSON Lines (de)serialization backed by `orjson` when it is
+installed, falling back to the standard library `json` module otherwise, a
+cached timestamp helper for log lines, and queue-backed console loggers.
+"""
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+def json_dumps_line(data) -> bytes:
+    """
+    Serializes data to a single line of compact, UTF-8 encoded JSON, newline terminated.
+
+    Args:
+        data: The JSON-serializable object to encode.
+
+    Returns:
+        bytes: The encoded JSON Lines record.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b"\n"
+
+def json_loads(raw: bytes):
+    """
+    Deserializes a UTF-8 encoded JSON document.
+
+    Args:
+        raw (bytes): The encoded JSON document.
+
+    Returns:
+        The decoded Python object.
+
+    Raises:
+        json.JSONDecodeError: If `raw` is not valid JSON (`orjson.JSONDecodeError` is a subclass).
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+# Millisecond of the last timestamp handed out by now_iso, reused for calls within it
+_last_bucket = -1
+_last_now_iso = ""
+
+def now_iso() -> str:
+    """
+    Returns the current local time as an ISO 8601 string, cached at millisecond resolution.
+
+    Log-heavy mock paths call this many times per second; reusing the formatted string
+    within a millisecond avoids building a new `datetime` and string on every call.
+
+    Returns:
+        str: The current time in ISO 8601 format.
+    """
+    global _last_bucket, _last_now_iso
+    now = time.time()
+    # Compared for inequality, so a wall clock stepped backwards (e.g. by NTP) is picked up at once
+    bucket = int(now * 1000)
+    if bucket != _last_bucket:
+        _last_now_iso = datetime.datetime.fromtimestamp(now).isoformat()
+        _last_bucket = bucket
+    return _last_now_iso
+
+def read_jsonl(path: str) -> list:
+    """
+    Loads every record of a JSON Lines file, streaming it line by line.
+
+    Blank lines are ignored, and a malformed line (e.g. a record cut short by a crash
+    mid-write) is skipped rather than discarding the rest of the file.
+
+    Args:
+        path (str): The path to the JSON Lines file.
+
+    Returns:
+        list: The decoded records, in file order.
+    """
+    records = []
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                records.append(json_loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+# --- Console Logging ---
+# Console output of every mock logger goes through one queue; a single listener thread
+# does the blocking stdout writes, so callers on the request path only enqueue a record
+_console_queue = queue.SimpleQueue()
+_console_listener = None
+
+def get_console_logger(name: str) -> logging.Logger:
+    """
+    Returns a logger that writes its messages to stdout from a background listener thread.
+
+    The logger only puts records on a queue, so logging a message never waits on the
+    `sys.stdout` lock. The listener is started on first use and stopped (after draining
+    the queue) at interpreter exit.
+
+    Args:
+        name (str): The logger name, e.g. "mock_alert".
+
+    Returns:
+        logging.Logger: The queue-backed logger.
+    """
+    global _console_listener
+    if _console_listener is None:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _console_listener = logging.handlers.QueueListener(_console_queue, handler)
+        _console_listener.start()
+        atexit.register(_console_listener.stop)
+
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        logger.addHandler(logging.handlers.QueueHandler(_console_queue))
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
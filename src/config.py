@@ -1,11 +1,13 @@
 """
 This module manages the application's configuration settings.
 
-It loads environment variables using `dotenv` and defines a `Config` class
-to centralize access to various service-specific settings, including
+It loads environment variables using `dotenv` and defines a frozen `Config`
+dataclass to centralize access to various service-specific settings, including
 API keys, mock toggles, and resource paths.
 """
 import os
+from dataclasses import dataclass
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,7 +15,34 @@ load_dotenv()
 # Global configuration variables, typically for LLM usage or general app state
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 USE_MOCK_LLM = os.getenv("USE_MOCK_LLM", "false").lower() == "true"
+# Simulated latency of the mock LLM response helper, in milliseconds (0 disables it)
+MOCK_LLM_LATENCY_MS = int(os.getenv("MOCK_LLM_LATENCY_MS", 0))
+# Connection pool and retry settings for the async OpenAI HTTP client
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", 1000))
+OPENAI_TIMEOUT_S = float(os.getenv("OPENAI_TIMEOUT_S", 60))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 3))
+# HTTP transport for the OpenAI client: "httpx" (default) or "aiohttp" (requires openai[aiohttp])
+OPENAI_HTTP_BACKEND = os.getenv("OPENAI_HTTP_BACKEND", "httpx").lower()
+# Open a connection to the OpenAI API at start-up so the first request skips the handshake
+OPENAI_WARMUP = os.getenv("OPENAI_WARMUP", "true").lower() == "true"
+# Maximum number of generated email drafts kept in the exact-match LLM cache
+LLM_DRAFT_CACHE_SIZE = int(os.getenv("LLM_DRAFT_CACHE_SIZE", 2048))
+# Seconds a cached email draft stays valid
+LLM_DRAFT_CACHE_TTL_S = float(os.getenv("LLM_DRAFT_CACHE_TTL_S", 3600))
+# Maximum number of concurrent LLM requests, to stay within the provider's rate limits
+LLM_MAX_INFLIGHT = int(os.getenv("LLM_MAX_INFLIGHT", 16))
+# Upper bound on the tokens generated for an email draft
+OPENAI_MAX_TOKENS = int(os.getenv("OPENAI_MAX_TOKENS", 512))
+# Seconds between status checks of an OpenAI Batch API job
+OPENAI_BATCH_POLL_S = float(os.getenv("OPENAI_BATCH_POLL_S", 30))
+# OpenMP threads used by FAISS in the RAG service, set once at start-up (0 keeps the FAISS default).
+# Queries are answered one at a time, so one thread per search avoids starting an OpenMP
+# team for every single-vector query
+FAISS_OMP_THREADS = int(os.getenv("FAISS_OMP_THREADS", 1))
+# Maximum number of quotation requests accepted by one /quote/batch call
+MAX_QUOTE_BATCH = int(os.getenv("MAX_QUOTE_BATCH", 100))
 
+@dataclass(frozen=True, slots=True)
 class Config:
     """
     Centralized configuration class for managing various application settings
@@ -22,59 +51,66 @@ class Config:
     Attributes are categorized by the service they configure (General, LLM,
     Google Sheets, Salesforce, Google Drive, Email, Internal Alerts).
     Boolean flags (e.g., `_ENABLED`) allow for easy toggling of mock services.
+    The values are read from the environment at import time; instances are frozen
+    and slotted, so settings cannot be changed at runtime and attribute reads skip
+    the instance `__dict__`.
     """
     # --- General Settings ---
-    MOCK_MODE_ENABLED = os.getenv('MOCK_MODE_ENABLED', 'true').lower() == 'true'
+    MOCK_MODE_ENABLED: bool = os.getenv('MOCK_MODE_ENABLED', 'true').lower() == 'true'
     """Global flag to enable/disable mock mode for all services."""
+    IO_THREAD_POOL_SIZE: int = int(os.getenv('IO_THREAD_POOL_SIZE', 16))
+    """Maximum worker threads for blocking service I/O, such as attachment uploads."""
+    MOCK_PERSIST_TO_DISK: bool = os.getenv('MOCK_PERSIST_TO_DISK', 'true').lower() == 'true'
+    """Whether mock services write their records to log files, or only keep them in memory."""
 
     # --- LLM Settings ---
-    LLM_API_KEY = os.getenv('LLM_API_KEY')
+    LLM_API_KEY: Optional[str] = os.getenv('LLM_API_KEY')
     """API key for the Language Model service."""
-    MOCK_LLM_ENABLED = os.getenv('MOCK_LLM_ENABLED', 'true').lower() == 'true'
+    MOCK_LLM_ENABLED: bool = os.getenv('MOCK_LLM_ENABLED', 'true').lower() == 'true'
     """Flag to enable/disable the mock LLM service."""
 
     # --- Google Sheets Settings ---
-    GOOGLE_SHEETS_CREDENTIALS_PATH = os.getenv('GOOGLE_SHEETS_CREDENTIALS_PATH', 'credentials.json')
+    GOOGLE_SHEETS_CREDENTIALS_PATH: str = os.getenv('GOOGLE_SHEETS_CREDENTIALS_PATH', 'credentials.json')
     """Path to the Google Sheets API credentials file."""
-    RFQ_SHEET_ID = os.getenv('RFQ_SHEET_ID')
+    RFQ_SHEET_ID: Optional[str] = os.getenv('RFQ_SHEET_ID')
     """The ID of the Google Sheet used for RFQ data."""
-    MOCK_GOOGLE_SHEETS_ENABLED = os.getenv('MOCK_GOOGLE_SHEETS_ENABLED', 'true').lower() == 'true'
+    MOCK_GOOGLE_SHEETS_ENABLED: bool = os.getenv('MOCK_GOOGLE_SHEETS_ENABLED', 'true').lower() == 'true'
     """Flag to enable/disable the mock Google Sheets service."""
 
     # --- Salesforce (CRM) Settings ---
-    SALESFORCE_USERNAME = os.getenv('SALESFORCE_USERNAME')
+    SALESFORCE_USERNAME: Optional[str] = os.getenv('SALESFORCE_USERNAME')
     """Salesforce username for API access."""
-    SALESFORCE_PASSWORD = os.getenv('SALESFORCE_PASSWORD')
+    SALESFORCE_PASSWORD: Optional[str] = os.getenv('SALESFORCE_PASSWORD')
     """Salesforce password for API access."""
-    SALESFORCE_SECURITY_TOKEN = os.getenv('SALESFORCE_SECURITY_TOKEN')
+    SALESFORCE_SECURITY_TOKEN: Optional[str] = os.getenv('SALESFORCE_SECURITY_TOKEN')
     """Salesforce security token for API access."""
-    MOCK_SALESFORCE_ENABLED = os.getenv('MOCK_SALESFORCE_ENABLED', 'true').lower() == 'true'
+    MOCK_SALESFORCE_ENABLED: bool = os.getenv('MOCK_SALESFORCE_ENABLED', 'true').lower() == 'true'
     """Flag to enable/disable the mock Salesforce CRM service."""
 
     # --- Google Drive Settings ---
-    GOOGLE_DRIVE_FOLDER_ID = os.getenv('GOOGLE_DRIVE_FOLDER_ID')
+    GOOGLE_DRIVE_FOLDER_ID: Optional[str] = os.getenv('GOOGLE_DRIVE_FOLDER_ID')
     """The ID of the Google Drive folder for archiving attachments."""
-    MOCK_GOOGLE_DRIVE_ENABLED = os.getenv('MOCK_GOOGLE_DRIVE_ENABLED', 'true').lower() == 'true'
+    MOCK_GOOGLE_DRIVE_ENABLED: bool = os.getenv('MOCK_GOOGLE_DRIVE_ENABLED', 'true').lower() == 'true'
     """Flag to enable/disable the mock Google Drive service."""
 
     # --- Email Settings (for auto-reply) ---
-    SENDER_EMAIL = os.getenv('SENDER_EMAIL')
+    SENDER_EMAIL: Optional[str] = os.getenv('SENDER_EMAIL')
     """The email address used to send automated replies."""
-    SENDER_EMAIL_PASSWORD = os.getenv('SENDER_EMAIL_PASSWORD') # Or app-specific password
+    SENDER_EMAIL_PASSWORD: Optional[str] = os.getenv('SENDER_EMAIL_PASSWORD') # Or app-specific password
     """The password or app-specific password for the sender email account."""
-    SMTP_SERVER = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
+    SMTP_SERVER: str = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
     """The SMTP server hostname for sending emails."""
-    SMTP_PORT = int(os.getenv('SMTP_PORT', 587))
+    SMTP_PORT: int = int(os.getenv('SMTP_PORT', 587))
     """The SMTP server port for sending emails."""
-    MOCK_EMAIL_SENDER_ENABLED = os.getenv('MOCK_EMAIL_SENDER_ENABLED', 'true').lower() == 'true'
+    MOCK_EMAIL_SENDER_ENABLED: bool = os.getenv('MOCK_EMAIL_SENDER_ENABLED', 'true').lower() == 'true'
     """Flag to enable/disable the mock email sender service."""
 
     # --- Internal Alert Settings (Slack/Teams) ---
-    SLACK_WEBHOOK_URL = os.getenv('SLACK_WEBHOOK_URL')
+    SLACK_WEBHOOK_URL: Optional[str] = os.getenv('SLACK_WEBHOOK_URL')
     """Webhook URL for Slack alerts."""
-    TEAMS_WEBHOOK_URL = os.getenv('TEAMS_WEBHOOK_URL')
+    TEAMS_WEBHOOK_URL: Optional[str] = os.getenv('TEAMS_WEBHOOK_URL')
     """Webhook URL for Microsoft Teams alerts."""
-    MOCK_ALERT_SENDER_ENABLED = os.getenv('MOCK_ALERT_SENDER_ENABLED', 'true').lower() == 'true'
+    MOCK_ALERT_SENDER_ENABLED: bool = os.getenv('MOCK_ALERT_SENDER_ENABLED', 'true').lower() == 'true'
     """Flag to enable/disable the mock internal alert sender service."""
 
 # Instantiate config
@@ -1,13 +1,131 @@
+import base64
 import email
+import io
+import re
+import uuid
 from email import policy
+from email.header import Header, decode_header, make_header
 from email.message import EmailMessage
+from email.parser import BytesHeaderParser
 from typing import Dict, Any, List, Tuple
+from urllib.parse import quote
+
+# MIME types for the attachment extensions recognized by `create_mock_email`
+_EXTENSION_MIME_TYPES = {
+    'pdf': ('application', 'pdf'),
+    'jpg': ('image', 'jpeg'),
+    'jpeg': ('image', 'jpeg'),
+    'png': ('image', 'png'),
+    'gif': ('image', 'gif'),
+}
+
+# Encoded characters decoded per read of a base64 attachment stream. A multiple of 4 keeps
+# base64 quanta whole, so each block decodes on its own.
+_BASE64_BLOCK_CHARS = 64 * 1024
+# Line breaks and any other characters outside the base64 alphabet, which decoders skip
+_NON_BASE64 = re.compile(r"[^A-Za-z0-9+/=]+")
+
+class _Base64Stream(io.RawIOBase):
+    """
+    A readable binary stream that decodes a base64 transfer-encoded payload block by block,
+    so the decoded attachment is never held in memory as a whole.
+    """
+    def __init__(self, encoded: str):
+        """
+        Initializes the stream.
+
+        Args:
+            encoded (str): The base64 text of a message part, line breaks included.
+        """
+        self._encoded = encoded
+        self._position = 0
+        self._carry = ""       # Characters of an incomplete 4-character quantum
+        self._decoded = b""    # Decoded bytes of the current block
+        self._offset = 0       # Bytes of `_decoded` already returned
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while self._offset == len(self._decoded) and self._position < len(self._encoded):
+            block = self._encoded[self._position:self._position + _BASE64_BLOCK_CHARS]
+            self._position += len(block)
+            chars = self._carry + _NON_BASE64.sub("", block)
+            if self._position < len(self._encoded):
+                whole = len(chars) - len(chars) % 4
+                chars, self._carry = chars[:whole], chars[whole:]
+            else:
+                # Lenient like email's own decoder: a truncated last quantum is padded
+                chars, self._carry = chars + "=" * (-len(chars) % 4), ""
+            self._decoded = base64.b64decode(chars)
+            self._offset = 0
+        size = min(len(buffer), len(self._decoded) - self._offset)
+        buffer[:size] = self._decoded[self._offset:self._offset + size]
+        self._offset += size
+        return size
+
+class EmailAttachment:
+    """
+    A lazily decoded email attachment.
+
+    The transfer-encoded payload stays in the parsed message part until it is read,
+    so parsing an email does not decode every attachment into memory up front.
+    """
+    __slots__ = ("filename", "content_type", "_part", "_payload")
+
+    def __init__(self, filename: str, content_type: str, part: EmailMessage):
+        """
+        Initializes the EmailAttachment.
+
+        Args:
+            filename (str): The attachment filename.
+            content_type (str): The attachment MIME type, e.g. 'application/pdf'.
+            part (EmailMessage): The message part holding the encoded payload.
+        """
+        self.filename = filename
+        self.content_type = content_type
+        self._part = part
+        self._payload = None
+
+    @property
+    def payload(self) -> bytes:
+        """
+        bytes: The decoded attachment content, decoded on first access and then kept.
+        """
+        if self._payload is None:
+            self._payload = self._part.get_payload(decode=True) or b""
+        return self._payload
+
+    def open(self) -> io.BufferedIOBase:
+        """
+        Returns the attachment content as a readable binary stream.
+
+        Base64 attachments are decoded block by block as the stream is read, so copying
+        one out in chunks never holds the whole decoded content in memory. Other transfer
+        encodings, and attachments whose `payload` was already read, are served from the
+        decoded bytes.
+
+        Returns:
+            io.BufferedIOBase: A file-like object positioned at the start of the content.
+        """
+        if self._payload is None and self._part.get('content-transfer-encoding', '').strip().lower() == 'base64':
+            return io.BufferedReader(_Base64Stream(self._part.get_payload()))
+        return io.BytesIO(self.payload)
+
+    def __getitem__(self, key: str) -> Any:
+        # Keeps dict-style access ('filename', 'content_type', 'payload') working
+        if key not in ("filename", "content_type", "payload"):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __repr__(self) -> str:
+        return f"EmailAttachment(filename={self.filename!r}, content_type={self.content_type!r})"
 
 class EmailParser:
     """
     A utility class for parsing raw email content and creating mock emails.
     """
-    def parse_email(self, raw_email_content: bytes) -> Dict[str, Any]:
+    def parse_email(self, raw_email_content: bytes, headers_only: bool = False, include_html: bool = False) -> Dict[str, Any]:
         """
         Parses raw email content (bytes) into a structured dictionary.
 
@@ -15,41 +133,57 @@ class EmailParser:
 
         Args:
             raw_email_content (bytes): The raw byte content of an email.
+            headers_only (bool, optional): If True, only the subject and sender are parsed,
+                using a header-only parser with the lightweight `compat32` policy; the body
+                and attachment entries are returned empty. Defaults to False.
+            include_html (bool, optional): If True, the text/html body is also decoded into
+                "body_html"; otherwise "body_html" is left empty. Defaults to False.
 
         Returns:
             Dict[str, Any]: A dictionary containing parsed email components:
                 - "subject" (str): The email subject.
                 - "sender" (str): The email sender.
                 - "body_plain" (str): The plain text body of the email.
-                - "body_html" (str): The HTML body of the email.
-                - "attachments" (List[Dict[str, Any]]): A list of dictionaries,
-                  each representing an attachment with 'filename', 'content_type', and 'payload'.
+                - "body_html" (str): The HTML body of the email (only when `include_html` is True).
+                - "attachments" (List[EmailAttachment]): The attachments, each exposing
+                  'filename' and 'content_type'; the content is decoded only when
+                  `open()` or `payload` is used.
         """
+        if headers_only:
+            # Stops at the end of the header block and skips structured header parsing
+            headers = BytesHeaderParser(policy=policy.compat32).parsebytes(raw_email_content)
+            return {
+                "subject": self._decode_compat32_header(headers['subject']),
+                "sender": self._decode_compat32_header(headers['from']),
+                "body_plain": "",
+                "body_html": "",
+                "attachments": []
+            }
+
         msg = email.message_from_bytes(raw_email_content, policy=policy.default)
         
         subject = msg['subject'] or ''
         sender = msg['from'] or ''
         
-        body_plain = ""
+        # get_body picks the preferred body part without decoding the other parts
+        plain_part = msg.get_body(preferencelist=('plain',))
+        body_plain = self._decode_text_part(plain_part) if plain_part is not None else ""
         body_html = ""
-        attachments = []
+        if include_html:
+            # The pipeline only reads the plain body, so the HTML alternative is decoded on request
+            html_part = msg.get_body(preferencelist=('html',))
+            body_html = self._decode_text_part(html_part) if html_part is not None else ""
 
+        attachments = []
+        # walk() also visits nested multiparts and forwarded message/rfc822 parts, which
+        # iter_attachments() does not descend into. The payload is left encoded in the
+        # part until the attachment is opened.
         for part in msg.walk():
-            content_type = part.get_content_type()
-            content_disposition = part.get_content_disposition()
-
-            if content_disposition == 'attachment':
-                filename = part.get_filename()
-                if filename:
-                    attachments.append({
-                        'filename': filename,
-                        'content_type': content_type,
-                        'payload': part.get_payload(decode=True)
-                    })
-            elif content_type == 'text/plain' and not content_disposition:
-                body_plain = part.get_payload(decode=True).decode()
-            elif content_type == 'text/html' and not content_disposition:
-                body_html = part.get_payload(decode=True).decode()
+            if part.get_content_disposition() != 'attachment':
+                continue
+            filename = part.get_filename()
+            if filename:
+                attachments.append(EmailAttachment(filename, part.get_content_type(), part))
 
         return {
             "subject": subject,
@@ -59,6 +193,37 @@ class EmailParser:
             "attachments": attachments
         }
 
+    @staticmethod
+    def _decode_compat32_header(value) -> str:
+        """
+        Decodes a raw `compat32` header value, including any RFC 2047 encoded words.
+
+        Args:
+            value: The raw header value, or None if the header is absent.
+
+        Returns:
+            str: The decoded header value, or an empty string if the header is absent.
+        """
+        if value is None:
+            return ''
+        if '=?' not in value:
+            return value
+        return str(make_header(decode_header(value)))
+
+    @staticmethod
+    def _decode_text_part(part: EmailMessage) -> str:
+        """
+        Decodes a text part's transfer-encoded payload to `str` in a single step.
+
+        Args:
+            part (EmailMessage): A text/plain or text/html message part.
+
+        Returns:
+            str: The decoded text, using the part's declared charset (UTF-8 if none is declared).
+        """
+        payload = part.get_payload(decode=True) or b""
+        return payload.decode(part.get_content_charset() or 'utf-8', errors='replace')
+
     def create_mock_email(self, subject: str, body: str, sender: str = 'test@example.com', attachments: List[Tuple[str, bytes]] = None) -> bytes:
         """
         Creates a mock raw email in bytes format.
@@ -76,24 +241,71 @@ class EmailParser:
         Returns:
             bytes: The raw byte content of the created mock email.
         """
-        msg = EmailMessage()
-        msg['Subject'] = subject
-        msg['From'] = sender
-        msg['To'] = 'alrouf@example.com'
-
-        msg.set_content(body)
-
-        if attachments:
-            for filename, content in attachments:
-                maintype, subtype = 'application', 'octet-stream'
-                if '.' in filename:
-                    ext = filename.split('.')[-1]
-                    if ext == 'pdf':
-                        maintype, subtype = 'application', 'pdf'
-                    elif ext in ['jpg', 'jpeg', 'png', 'gif']: # Basic image types
-                        maintype, subtype = 'image', ext
-                
-                msg.add_attachment(content, maintype=maintype, subtype=subtype, filename=filename)
-        
-        return msg.as_bytes(policy=policy.default)
+        # The MIME envelope is written directly as bytes: one base64 text body plus optional
+        # base64 attachments. This skips EmailMessage's policy-driven formatting pass, which
+        # dominates the cost of building the many small messages used in tests and benchmarks.
+        buf = bytearray()
+        buf += b"Subject: " + self._encode_header(subject) + b"\n"
+        buf += b"From: " + self._encode_header(sender) + b"\n"
+        buf += b"To: alrouf@example.com\nMIME-Version: 1.0\n"
+
+        body_part = (
+            b'Content-Type: text/plain; charset="utf-8"\n'
+            b"Content-Transfer-Encoding: base64\n\n"
+            + base64.encodebytes((body if body.endswith("\n") else body + "\n").encode('utf-8'))
+        )
+        if not attachments:
+            buf += body_part
+            return bytes(buf)
 
+        boundary = f"==============={uuid.uuid4().hex}==".encode('ascii')
+        buf += b'Content-Type: multipart/mixed; boundary="' + boundary + b'"\n\n'
+        buf += b"--" + boundary + b"\n" + body_part
+        for filename, content in attachments:
+            ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+            maintype, subtype = _EXTENSION_MIME_TYPES.get(ext, ('application', 'octet-stream'))
+
+            buf += b"\n--" + boundary + b"\n"
+            buf += f"Content-Type: {maintype}/{subtype}\n".encode('ascii')
+            buf += b"Content-Disposition: attachment; " + self._encode_filename_param(filename) + b"\n"
+            buf += b"Content-Transfer-Encoding: base64\n\n"
+            buf += base64.encodebytes(content)
+        buf += b"\n--" + boundary + b"--\n"
+        return bytes(buf)
+
+    @staticmethod
+    def _encode_header(value: str) -> bytes:
+        """
+        Encodes a header value, using RFC 2047 encoded words when it is not plain ASCII.
+
+        Args:
+            value (str): The header value.
+
+        Returns:
+            bytes: The header value ready to be written after the field name.
+
+        Raises:
+            ValueError: If the value contains a line break (which would inject headers).
+        """
+        if '\r' in value or '\n' in value:
+            raise ValueError(f"Header value must not contain line breaks: {value!r}")
+        if value.isascii():
+            return value.encode('ascii')
+        return Header(value, 'utf-8').encode().encode('ascii')
+
+    @staticmethod
+    def _encode_filename_param(filename: str) -> bytes:
+        """
+        Formats the `filename` parameter of a Content-Disposition header.
+
+        Args:
+            filename (str): The attachment filename.
+
+        Returns:
+            bytes: A quoted `filename="..."` parameter, or an RFC 2231 `filename*=`
+                   parameter for non-ASCII names.
+        """
+        if filename.isascii():
+            escaped = filename.replace('\\', '\\\\').replace('"', '\\"')
+            return f'filename="{escaped}"'.encode('ascii')
+        return f"filename*=utf-8''{quote(filename, safe='')}".encode('ascii')
@@ -1,20 +1,110 @@
 import time
+import asyncio
+import json
+import logging
+import re
 import numpy as np
 import hashlib
-from typing import List, Optional
+from collections import ChainMap, OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import httpx
 import openai
+try:
+    import aiohttp # Optional: enables the aiohttp transport for the OpenAI client
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    aiohttp = None
+    AIOHTTP_AVAILABLE = False
+try:
+    import h2 # Optional: enables HTTP/2 on the httpx transport (installed by httpx[http2])
+    H2_AVAILABLE = True
+except ImportError:
+    h2 = None
+    H2_AVAILABLE = False
 from mocks.mock_llm_service import MockLLMService
 # FIX: Changed to a relative import to correctly reference config from the parent 'src' directory
-from ..config import USE_MOCK_LLM, OPENAI_API_KEY
+from ..config import USE_MOCK_LLM, OPENAI_API_KEY, OPENAI_MAX_CONNECTIONS, OPENAI_TIMEOUT_S, OPENAI_MAX_RETRIES, LLM_DRAFT_CACHE_SIZE, LLM_MAX_INFLIGHT, OPENAI_MAX_TOKENS, OPENAI_HTTP_BACKEND, OPENAI_BATCH_POLL_S, LLM_DRAFT_CACHE_TTL_S, MOCK_LLM_LATENCY_MS, OPENAI_WARMUP
+
+logger = logging.getLogger(__name__)
+# System prompt for email draft generation. It is kept byte-identical across calls and
+# never interpolated with request data, so the provider's automatic prompt-prefix caching
+# can reuse it; quotation details belong in the user message only.
+_EMAIL_DRAFT_SYSTEM_PROMPT = "You are a helpful assistant that summarizes quotation details into professional email drafts."
+# The system message is shared by every request; the SDK only reads it when serializing
+_EMAIL_DRAFT_SYSTEM_MESSAGE = {"role": "system", "content": _EMAIL_DRAFT_SYSTEM_PROMPT}
+
+# User prompt for email drafts, filled with a single format_map call per request
+_EMAIL_DRAFT_PROMPT_TEMPLATE = """
+        Generate {lang_request} email draft summarizing a quotation.
+        The client is {client_name}.
+        The grand total is {grand_total:.2f} {currency}.
+        Delivery terms: {delivery_terms}.
+        Special notes: {notes}
+ Please create a professional email draft that includes these details. Make sure to use appropriate language for the chosen language (e.g., formal Arabic).
+        If generating a bilingual draft, provide both versions clearly separated.
+        """
+
+# Fallbacks for summary fields missing from the request's summary data
+_EMAIL_DRAFT_PROMPT_DEFAULTS = {
+    "client_name": "Client",
+    "currency": "",
+    "grand_total": 0.0,
+    "delivery_terms": "Not specified",
+    "notes": "No specific notes.",
+}
+
+# RAG prompts; only the template for the requested language is filled per call
+_RAG_PROMPT_TEMPLATE_EN = """
+    You are a helpful AI assistant. Answer the user's question only based on the provided context. 
+    If the answer cannot be found in the context, state that you don't have enough information. 
+    Ensure the answer is in English.
+
+    Context:
+    {context}
+
+    Question: {query}
+    Answer:
+    """
+
+_RAG_PROMPT_TEMPLATE_AR = """
+    أنت مساعد ذكاء اصطناعي مفيد. أجب على سؤال المستخدم بناءً على السياق المقدم فقط. 
+    إذا لم يتم العثور على الإجابة في السياق، فاذكر أنه ليس لديك معلومات كافية. 
+    تأكد من أن الإجابة باللغة العربية.
+
+    السياق:
+    {context}
+
+    السؤال: {query}
+    الإجابة:
+    """
+
+# Word tokens of the query for the relevance check (Unicode-aware, covers Arabic). Punctuation,
+# including hyphens inside SKU codes such as "ALR-SL-90W", separates tokens.
+_WORD_PATTERN = re.compile(r"\w+")
+
+# Mock embeddings are fixed-size vectors (128 dimensions); element i is seed % (i + 1) / (i + 1).
+# The size is a multiple of 16 so FAISS runs its unrolled AVX2/AVX-512 distance kernels.
+_EMBEDDING_SIZE = 128
+MOCK_EMBEDDING_DIM = _EMBEDDING_SIZE # Public, for callers that preallocate embedding buffers
+# Identifies the mock embedding function for persisted embeddings; bump it whenever the
+# function's output changes, so caches built by an earlier version are not reused
+MOCK_EMBEDDER_ID = f"mock-blake2b-mod-v1-d{_EMBEDDING_SIZE}"
+_EMBEDDING_DIVISORS = np.arange(1, _EMBEDDING_SIZE + 1, dtype=np.uint64)
+# Reciprocals of the divisors, so each embedding costs a multiply instead of a divide
+_EMBEDDING_INVERSES = 1.0 / _EMBEDDING_DIVISORS.astype(np.float64)
+
 # Define a set of common stop words for mock relevance checking
-_STOP_WORDS = {"a", "an", "the", "is", "are", "was", "were", "what", "where", "when", "why", "how", "of", "in", "on", "for", "with", "and", "or", "but", "i", "you", "he", "she", "it", "we", "they", "me", "him", "her", "us", "them", "my", "your", "his", "our", "their", "france", "capital"} # Added 'france' and 'capital' for this specific test case
+_STOP_WORDS = frozenset({"a", "an", "the", "is", "are", "was", "were", "what", "where", "when", "why", "how", "of", "in", "on", "for", "with", "and", "or", "but", "i", "you", "he", "she", "it", "we", "they", "me", "him", "her", "us", "them", "my", "your", "his", "our", "their", "france", "capital"}) # Added 'france' and 'capital' for this specific test case
 
-def get_llm_response(prompt: str, language: str = "en") -> str:
+async def get_llm_response(prompt: str, language: str = "en") -> str:
     """
     Mocks an LLM response based on the prompt and desired language.
 
     Simulates a basic LLM interaction for testing or development when
-    a real LLM service is not available or desired.
+    a real LLM service is not available or desired. The simulated latency
+    (`MOCK_LLM_LATENCY_MS`, off by default) is awaited, so it never blocks
+    the event loop.
 
     Args:
         prompt (str): The input prompt for the LLM.
@@ -24,8 +114,9 @@ def get_llm_response(prompt: str, language: str = "en") -> str:
     Returns:
         str: A mock LLM response string, localized if specified.
     """
-    print(f"[MOCK LLM] Receiving prompt (lang={language}): {prompt[:100]}...")
-    time.sleep(0.1) # Simulate LLM processing time
+    logger.debug("[MOCK LLM] Receiving prompt (lang=%s): %.100s...", language, prompt)
+    if MOCK_LLM_LATENCY_MS > 0:
+        await asyncio.sleep(MOCK_LLM_LATENCY_MS / 1000) # Simulate LLM processing time
 
     if "What is your name" in prompt:
         return "I am a helpful AI assistant." if language == "en" else "أنا مساعد ذكاء اصطناعي مفيد."
@@ -50,12 +141,99 @@ def get_mock_embedding(text: str) -> List[float]:
     Returns:
         List[float]: A list of floats representing the mock embedding.
     """
+    return _cached_mock_embedding(text).tolist()
+
+def get_mock_embedding_array(text: str) -> np.ndarray:
+    """
+    Array form of `get_mock_embedding`, for callers that feed the vector to NumPy/FAISS.
+
+    Args:
+        text (str): The input text to generate a mock embedding for.
+
+    Returns:
+        np.ndarray: A read-only float64 vector of length 128 (shared with the cache; copy it to modify).
+    """
+    return _cached_mock_embedding(text)
+
+def get_mock_embeddings_batch(texts: List[str]) -> np.ndarray:
+    """
+    Generates the mock embeddings of many texts at once, as one float32 matrix.
+
+    Only the per-text seed digest runs in Python; the expansion of all seeds into
+    vectors is a single broadcast NumPy operation written straight into the output.
+
+    Args:
+        texts (List[str]): The input texts.
+
+    Returns:
+        np.ndarray: A C-contiguous float32 array of shape (len(texts), 128), whose rows
+                    match `get_mock_embedding_array` for the same texts.
+    """
+    seeds = np.fromiter((_embedding_seed(text) for text in texts), dtype=np.uint64, count=len(texts))
+    embeddings = np.empty((len(texts), _EMBEDDING_SIZE), dtype=np.float32)
+    np.multiply(seeds[:, None] % _EMBEDDING_DIVISORS, _EMBEDDING_INVERSES, out=embeddings, casting='same_kind')
+    return embeddings
+
+def get_mock_embedding_into(text: str, out: np.ndarray) -> None:
+    """
+    Writes the mock embedding of `text` into an existing buffer, allocating no output array.
+
+    Args:
+        text (str): The input text.
+        out (np.ndarray): A writable float32 (or float64) vector of length `MOCK_EMBEDDING_DIM`.
+    """
+    np.multiply(np.uint64(_embedding_seed(text)) % _EMBEDDING_DIVISORS, _EMBEDDING_INVERSES, out=out, casting='same_kind')
+
+def _embedding_seed(text: str) -> int:
+    """
+    Derives the 64-bit mock embedding seed of `text`.
+
+    The seed only needs to be reproducible, so a fast 8-byte BLAKE2b digest replaces SHA-256.
+    """
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+# Retries and re-submitted quotes rebuild identical prompts, so they are memoized per field values
+@lru_cache(maxsize=1024)
+def _build_email_draft_prompt(lang: str, client_name: str, currency: str, grand_total_cents: int, delivery_terms: str, notes: str) -> str:
+    """
+    Fills the email draft prompt template.
+
+    Args:
+        lang (str): The desired language for the email draft (e.g., "en", "ar", "bilingual").
+        client_name (str): The client's name.
+        currency (str): The quotation currency.
+        grand_total_cents (int): The grand total in cents, so the cache key compares exactly.
+        delivery_terms (str): The delivery terms.
+        notes (str): Special notes for the quotation.
+
+    Returns:
+        str: The formatted prompt string for the LLM.
+    """
+    # Adjust the language request in the prompt based on the 'lang' parameter
+    lang_request = f"a {lang}" if lang not in ["bilingual", "both", "en_ar"] else "a bilingual Arabic and English"
+    return _EMAIL_DRAFT_PROMPT_TEMPLATE.format(
+        lang_request=lang_request,
+        client_name=client_name,
+        currency=currency,
+        grand_total=grand_total_cents / 100,
+        delivery_terms=delivery_terms,
+        notes=notes,
+    )
+
+# Embeddings are cached per text, since RAG pipelines re-embed the same chunks
+@lru_cache(maxsize=4096)
+def _cached_mock_embedding(text: str) -> np.ndarray:
+    """
+    Computes the mock embedding of `text`, memoized because it depends on `text` only.
+
+    The result is marked read-only so a cached value cannot be modified by a caller.
+    """
     # Use a simple hashing approach to create a reproducible 'embedding'
     # This is not a real semantic embedding but serves as a placeholder for structure.
-    hash_val = int(hashlib.sha256(text.encode('utf-8')).hexdigest(), 16)
-    # Create a small, fixed-size vector (e.g., 128 dimensions)
-    embedding_size = 128
-    mock_embedding = [(hash_val % (i + 1)) / (i + 1) for i in range(embedding_size)]
+    # A 64-bit seed keeps the modulo in machine integers, so the whole vector is one NumPy ufunc
+    seed = np.uint64(_embedding_seed(text))
+    mock_embedding = (seed % _EMBEDDING_DIVISORS) * _EMBEDDING_INVERSES
+    mock_embedding.flags.writeable = False
     return mock_embedding
 
 def get_llm_response_rag(query: str, context: List[str], language: str = "en") -> str:
@@ -84,44 +262,23 @@ def get_llm_response_rag(query: str, context: List[str], language: str = "en") -
 
     context_str = "\n".join(context)
     
-    prompt_template_en = f"""
-    You are a helpful AI assistant. Answer the user's question only based on the provided context. 
-    If the answer cannot be found in the context, state that you don't have enough information. 
-    Ensure the answer is in English.
-
-    Context:
-    {context_str}
-
-    Question: {query}
-    Answer:
-    """
-
-    prompt_template_ar = f"""
-    أنت مساعد ذكاء اصطناعي مفيد. أجب على سؤال المستخدم بناءً على السياق المقدم فقط. 
-    إذا لم يتم العثور على الإجابة في السياق، فاذكر أنه ليس لديك معلومات كافية. 
-    تأكد من أن الإجابة باللغة العربية.
-
-    السياق:
-    {context_str}
-
-    السؤال: {query}
-    الإجابة:
-    """
-
-    if language == "ar":
-        prompt = prompt_template_ar
-    else:
-        prompt = prompt_template_en
+    prompt_template = _RAG_PROMPT_TEMPLATE_AR if language == "ar" else _RAG_PROMPT_TEMPLATE_EN
+    prompt = prompt_template.format_map({"context": context_str, "query": query})
 
     # Filter query words for a more accurate relevance check in the mock
-    query_words_filtered = [
-        q_word.lower().strip("?!.,")
-        for q_word in query.split()
-        if q_word.lower().strip("?!.,") not in _STOP_WORDS
-    ]
-    
-    # Check if any non-stop-word from the query is present in the context
-    is_relevant_context = any(q_word in context_str.lower() for q_word in query_words_filtered)
+    # (duplicates collapse in the set; single characters, such as the "s" left by
+    # "what's", are dropped since they would match almost any context)
+    stop_words = _STOP_WORDS
+    query_words_filtered = {
+        q_word
+        for q_word in _WORD_PATTERN.findall(query.lower())
+        if len(q_word) > 1 and q_word not in stop_words
+    }
+
+    # Check if any non-stop-word from the query is present in the context. A substring
+    # match keeps partial words relevant, e.g. "lumen" against "lumens".
+    context_lower = context_str.lower()
+    is_relevant_context = any(q_word in context_lower for q_word in query_words_filtered)
 
     mock_answer_prefix = "English Answer: " if language == "en" else "الإجابة العربية: "
 
@@ -146,22 +303,68 @@ class LLMService:
     supporting both real OpenAI and a mock LLM for development/testing.
 
     Handles generating prompts and orchestrating calls to the LLM for tasks
-    like generating email drafts.
+    like generating email drafts. Generated drafts are kept in a bounded
+    exact-match LRU cache, since the prompt is fully determined by the
+    language and the quotation summary data; entries expire after
+    `LLM_DRAFT_CACHE_TTL_S` seconds.
     """
     def __init__(self):
         """
         Initializes the LLMService.
 
         It checks the `USE_MOCK_LLM` setting from config. If true, it uses `MockLLMService`.
-        Otherwise, it attempts to initialize the OpenAI client, raising an error if
-        `OPENAI_API_KEY` is not set.
+        Otherwise, it attempts to initialize the async OpenAI client, raising an error if
+        `OPENAI_API_KEY` is not set. The client's HTTP transport is httpx by default (over
+        HTTP/2 when `h2` is installed), or aiohttp when `OPENAI_HTTP_BACKEND=aiohttp` and
+        `aiohttp` is installed.
         """
+        self.http_client = None
+        self._draft_cache: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+        self._draft_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        # Caps the LLM calls in flight so batched requests stay within provider rate limits
+        self._inflight = asyncio.Semaphore(LLM_MAX_INFLIGHT)
         if USE_MOCK_LLM:
             self.client = MockLLMService()
         else:
             if not OPENAI_API_KEY:
                 raise ValueError("OPENAI_API_KEY not set in environment variables when USE_MOCK_LLM is false.")
-            self.client = openai.OpenAI(api_key=OPENAI_API_KEY)
+            # The async client lets the awaited chat completion yield to the event loop,
+            # and a large keep-alive pool avoids PoolTimeout under concurrent requests
+            if OPENAI_HTTP_BACKEND == "aiohttp" and AIOHTTP_AVAILABLE:
+                # aiohttp holds up better than the default httpx transport at high concurrency
+                self.http_client = openai.DefaultAioHttpClient(timeout=OPENAI_TIMEOUT_S)
+            else:
+                if OPENAI_HTTP_BACKEND == "aiohttp":
+                    print("aiohttp is not installed. Falling back to the httpx transport for OpenAI.")
+                # HTTP/2 multiplexes concurrent completions over a few pooled connections
+                self.http_client = httpx.AsyncClient(
+                    http2=H2_AVAILABLE,
+                    limits=httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS, max_keepalive_connections=OPENAI_MAX_CONNECTIONS),
+                    timeout=OPENAI_TIMEOUT_S,
+                )
+            self.client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=self.http_client, max_retries=OPENAI_MAX_RETRIES)
+
+    async def warmup(self):
+        """
+        Opens a connection from the OpenAI client's pool ahead of the first request.
+
+        Sends a cheap model-listing request so the TLS handshake (and HTTP/2 setup)
+        happens at start-up instead of on the first `/quote`. Failures are logged and
+        ignored, since the pool reconnects on demand. Does nothing in mock mode.
+        """
+        if USE_MOCK_LLM or not OPENAI_WARMUP:
+            return
+        try:
+            await self.client.with_options(max_retries=0).models.list()
+        except Exception as e:
+            logger.warning("OpenAI client warm-up failed: %s", e)
+
+    async def aclose(self):
+        """
+        Closes the pooled HTTP client used by the OpenAI client, if one was created.
+        """
+        if self.http_client is not None:
+            await self.http_client.aclose()
 
     def _generate_prompt(self, lang: str, summary_data: dict) -> str:
         """
@@ -176,30 +379,32 @@ class LLMService:
         Returns:
             str: The formatted prompt string for the LLM.
         """
-        client_name = summary_data.get('client_name', 'Client')
-        currency = summary_data.get('currency', '')
-        grand_total = summary_data.get('grand_total', 0.0)
-        delivery_terms = summary_data.get('delivery_terms', 'Not specified')
-        notes = summary_data.get('notes', 'No specific notes.')
-        # Adjust the language request in the prompt based on the 'lang' parameter
-        lang_request = f"a {lang}" if lang not in ["bilingual", "both", "en_ar"] else "a bilingual Arabic and English"
-        prompt = f"""
-        Generate {lang_request} email draft summarizing a quotation.
-        The client is {client_name}.
-        The grand total is {grand_total:.2f} {currency}.
-        Delivery terms: {delivery_terms}.
-        Special notes: {notes}
- Please create a professional email draft that includes these details. Make sure to use appropriate language for the chosen language (e.g., formal Arabic).
-        If generating a bilingual draft, provide both versions clearly separated.
+        fields = ChainMap(summary_data, _EMAIL_DRAFT_PROMPT_DEFAULTS)
+        return _build_email_draft_prompt(
+            lang,
+            fields['client_name'],
+            fields['currency'],
+            int(round(fields['grand_total'] * 100)),
+            fields['delivery_terms'],
+            fields['notes'],
+        )
+
+    @staticmethod
+    def _draft_cache_key(lang: str, summary_data: dict) -> Tuple[str, str]:
         """
-        return prompt
+        Builds the cache key for an email draft from the language and a digest of the
+        canonical (key-sorted) JSON form of the summary data.
+        """
+        canonical = json.dumps(summary_data, sort_keys=True, ensure_ascii=False, default=str)
+        return lang, hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
 
     async def generate_email_draft(self, lang: str, summary_data: dict) -> str:
         """
-        Asynchronously generates an email draft using the configured LLM client.
+        Asynchronously generates an email draft, serving repeated requests from the draft cache.
 
-        It constructs a prompt based on the provided summary data and desired language,
-        then calls either the mock LLM or the real OpenAI API to get the draft.
+        Concurrent requests for the same draft share a per-key lock, so only the
+        first one reaches the LLM and the others reuse its cached result. At most
+        `LLM_MAX_INFLIGHT` LLM calls run at the same time.
 
         Args:
             lang (str): The desired language for the email draft (e.g., "en", "ar", "bilingual").
@@ -208,16 +413,150 @@ class LLMService:
         Returns:
             str: The generated email draft content.
         """
-        prompt = self._generate_prompt(lang, summary_data)
+        key = self._draft_cache_key(lang, summary_data)
+        draft = self._get_cached_draft(key)
+        if draft is not None:
+            return draft
+
+        lock = self._draft_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            draft = self._get_cached_draft(key)
+            if draft is not None:
+                return draft
+            try:
+                async with self._inflight:
+                    draft = await self._request_email_draft(lang, summary_data)
+            finally:
+                self._draft_locks.pop(key, None)
+            self._draft_cache[key] = (time.monotonic() + LLM_DRAFT_CACHE_TTL_S, draft)
+            if len(self._draft_cache) > LLM_DRAFT_CACHE_SIZE:
+                self._draft_cache.popitem(last=False)
+        return draft
+
+    def _get_cached_draft(self, key: Tuple[str, str]) -> Optional[str]:
+        """
+        Returns the cached draft for `key`, or None if it is missing or has expired.
+
+        A hit is moved to the most-recently-used end of the cache; an expired entry is dropped.
+        """
+        entry = self._draft_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, draft = entry
+        if expires_at <= time.monotonic():
+            del self._draft_cache[key]
+            return None
+        self._draft_cache.move_to_end(key)
+        return draft
+
+    async def generate_email_drafts_offline(self, requests: List[Tuple[str, dict]]) -> List[str]:
+        """
+        Generates many email drafts through the OpenAI Batch API, for bulk jobs that can wait.
+
+        All prompts are uploaded as one JSONL file and processed as a single batch job,
+        which OpenAI bills at a discount but completes asynchronously (within 24 hours),
+        so this is meant for offline/bulk generation rather than the request path. The
+        job is polled every `OPENAI_BATCH_POLL_S` seconds. In mock mode the drafts are
+        generated directly.
+
+        Args:
+            requests (List[Tuple[str, dict]]): (lang, summary_data) pairs, one per draft.
+
+        Returns:
+            List[str]: The generated drafts, in the order of `requests`.
+
+        Raises:
+            RuntimeError: If the batch job fails, expires or is cancelled, or if any draft
+                          failed or is missing from the batch results. Each failed draft
+                          is logged with its index before the error is raised.
+        """
         if USE_MOCK_LLM:
-            # MockLLMService needs to be called directly
-            response = self.client.generate_response(prompt)
-            return response
+            return [self.client.generate_response_from_data(lang, summary_data) for lang, summary_data in requests]
+
+        lines = []
+        for i, (lang, summary_data) in enumerate(requests):
+            lines.append(json.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": "gpt-3.5-turbo",
+                    "messages": [
+                        _EMAIL_DRAFT_SYSTEM_MESSAGE,
+                        {"role": "user", "content": self._generate_prompt(lang, summary_data)}
+                    ],
+                    "max_tokens": OPENAI_MAX_TOKENS,
+                },
+            }, ensure_ascii=False))
+        batch_input = ("\n".join(lines) + "\n").encode('utf-8')
+
+        input_file = await self.client.files.create(file=("email_drafts.jsonl", batch_input), purpose="batch")
+        batch = await self.client.batches.create(
+            input_file_id=input_file.id, endpoint="/v1/chat/completions", completion_window="24h"
+        )
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            await asyncio.sleep(OPENAI_BATCH_POLL_S)
+            batch = await self.client.batches.retrieve(batch.id)
+        if batch.status != "completed":
+            raise RuntimeError(f"OpenAI batch {batch.id} ended with status '{batch.status}'.")
+
+        # Successful requests are written to the output file and failed ones to the error file
+        result_lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                result_lines.extend((await self.client.files.content(file_id)).text.splitlines())
+
+        drafts: List[Optional[str]] = [None] * len(requests)
+        errors: Dict[int, str] = {}
+        for line in result_lines:
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            i = int(result["custom_id"])
+            response = result.get("response") or {}
+            if response.get("status_code") == 200:
+                drafts[i] = response["body"]["choices"][0]["message"]["content"]
+            else:
+                errors[i] = str(result.get("error") or response.get("body") or f"status code {response.get('status_code')}")
+        for i, draft in enumerate(drafts):
+            if draft is None and i not in errors:
+                errors[i] = "no result in the batch output"
+
+        if errors:
+            for i in sorted(errors):
+                logger.error("Email draft %d of OpenAI batch %s failed: %s", i, batch.id, errors[i])
+            raise RuntimeError(
+                f"OpenAI batch {batch.id}: {len(errors)} of {len(requests)} email drafts failed "
+                f"(indices {sorted(errors)})."
+            )
+        return drafts
+
+    async def _request_email_draft(self, lang: str, summary_data: dict) -> str:
+        """
+        Requests an email draft from the configured LLM client, bypassing the cache.
+
+        The mock LLM receives the summary data directly; for the real OpenAI API a prompt
+        is constructed from the summary data and desired language.
+
+        Args:
+            lang (str): The desired language for the email draft (e.g., "en", "ar", "bilingual").
+            summary_data (dict): A dictionary containing summary details for the quotation.
+
+        Returns:
+            str: The generated email draft content.
+        """
+        if USE_MOCK_LLM:
+            # The mock formats its draft straight from the structured summary data
+            return self.client.generate_response_from_data(lang, summary_data)
+        prompt = self._generate_prompt(lang, summary_data)
         chat_completion = await self.client.chat.completions.create(
                 messages=[
-                    {"role": "system", "content": "You are a helpful assistant that summarizes quotation details into professional email drafts."},
+                    _EMAIL_DRAFT_SYSTEM_MESSAGE,
                     {"role": "user", "content": prompt}
                 ],
-                model="gpt-3.5-turbo" # Or gpt-4, depending on preference
+                model="gpt-3.5-turbo", # Or gpt-4, depending on preference
+                stream=False,
+                # A tight token budget keeps draft latency predictable
+                max_tokens=OPENAI_MAX_TOKENS,
             )
         return chat_completion.choices[0].message.content
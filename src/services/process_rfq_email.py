@@ -1,5 +1,11 @@
 import os
+import asyncio
 import datetime
+import logging
+from collections import ChainMap
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Tuple
 from config import settings
 from services.email_parser import EmailParser
 from mocks.mock_llm_service import MockLLMService
@@ -9,16 +15,92 @@ from mocks.mock_google_drive import MockGoogleDriveService
 from mocks.mock_email_sender import MockEmailSenderService
 from mocks.mock_alert_sender import MockAlertSenderService
 
-# Initialize services (using mocks based on config)
+# --- Service Providers ---
+# Each service is created on first use and then shared by every call, so a mock's
+# on-disk log is loaded once per process instead of once per processed email.
 email_parser = EmailParser()
-llm_service = MockLLMService() if settings.MOCK_LLM_ENABLED else None # Placeholder for real LLM
-google_sheets_service = MockGoogleSheetsService() if settings.MOCK_GOOGLE_SHEETS_ENABLED else None # Placeholder for real Sheets
-salesforce_crm_service = MockSalesforceCRMService() if settings.MOCK_SALESFORCE_ENABLED else None # Placeholder for real CRM
-google_drive_service = MockGoogleDriveService() if settings.MOCK_GOOGLE_DRIVE_ENABLED else None # Placeholder for real Drive
-email_sender_service = MockEmailSenderService() if settings.MOCK_EMAIL_SENDER_ENABLED else None # Placeholder for real Email Sender
-alert_sender_service = MockAlertSenderService() if settings.MOCK_ALERT_SENDER_ENABLED else None # Placeholder for real Alert Sender
-
-def process_rfq_email(raw_email_content: bytes):
+logger = logging.getLogger(__name__)
+
+# Auto-reply templates by language, filled with str.format once per email
+REPLY_TEMPLATES = {
+    "en": "Hello {name},\n\nThank you for your inquiry regarding {product}. We have received your request and will get back to you shortly.\n\nBest regards,\nAlrouf Team\n",
+    "ar": "مرحباً {name},\n\nشكراً لاستفسارك بخصوص {product}. لقد استلمنا طلبك وسنتواصل معك قريباً.\n\nمع خالص التقدير،\nفريق العروف\n",
+}
+# Greeting and product wording used when a field was not extracted
+REPLY_DEFAULTS = {
+    "en": {"name": "Valued Client", "product": "your request"},
+    "ar": {"name": "عميلنا العزيز", "product": "طلبك"},
+}
+# For simplicity, auto-replies are sent in English for now
+REPLY_LANGUAGE = "en"
+
+# Salesforce opportunity templates, each filled with a single format_map call
+OPPORTUNITY_NAME_TEMPLATE = "RFQ: {product} from {contact_person}"
+OPPORTUNITY_NAME_DEFAULTS = {"product": "Unknown Product", "contact_person": "Unknown Client"}
+OPPORTUNITY_DESCRIPTION_TEMPLATE = "RFQ for {quantity} {product}. Needed in {location} within {delivery_time}. Contact: {contact_email}"
+
+class SafeDict(dict):
+    """A dict that formats missing template fields as empty strings."""
+    def __missing__(self, key):
+        return ''
+
+@lru_cache(maxsize=1)
+def _rfq_dates(today: datetime.date) -> Tuple[str, str]:
+    """Returns today's ISO date and the estimated close date 4 weeks out, computed once per day."""
+    return today.isoformat(), (today + datetime.timedelta(weeks=4)).isoformat()
+
+@lru_cache(maxsize=None)
+def get_io_pool() -> ThreadPoolExecutor:
+    """Returns the shared thread pool that runs blocking service calls off the event loop."""
+    return ThreadPoolExecutor(max_workers=settings.IO_THREAD_POOL_SIZE, thread_name_prefix="rfq-io")
+
+@lru_cache(maxsize=None)
+def get_llm_service():
+    """Returns the shared LLM service (mock if enabled, otherwise a placeholder)."""
+    return MockLLMService() if settings.MOCK_LLM_ENABLED else None # Placeholder for real LLM
+
+@lru_cache(maxsize=None)
+def get_google_sheets_service():
+    """Returns the shared Google Sheets service (mock if enabled, otherwise a placeholder)."""
+    return MockGoogleSheetsService(persist=settings.MOCK_PERSIST_TO_DISK) if settings.MOCK_GOOGLE_SHEETS_ENABLED else None # Placeholder for real Sheets
+
+@lru_cache(maxsize=None)
+def get_salesforce_crm_service():
+    """Returns the shared Salesforce CRM service (mock if enabled, otherwise a placeholder)."""
+    return MockSalesforceCRMService(persist=settings.MOCK_PERSIST_TO_DISK) if settings.MOCK_SALESFORCE_ENABLED else None # Placeholder for real CRM
+
+@lru_cache(maxsize=None)
+def get_google_drive_service():
+    """Returns the shared Google Drive service (mock if enabled, otherwise a placeholder)."""
+    return MockGoogleDriveService(persist=settings.MOCK_PERSIST_TO_DISK) if settings.MOCK_GOOGLE_DRIVE_ENABLED else None # Placeholder for real Drive
+
+@lru_cache(maxsize=None)
+def get_email_sender_service():
+    """Returns the shared email sender service (mock if enabled, otherwise a placeholder)."""
+    return MockEmailSenderService(persist=settings.MOCK_PERSIST_TO_DISK) if settings.MOCK_EMAIL_SENDER_ENABLED else None # Placeholder for real Email Sender
+
+@lru_cache(maxsize=None)
+def get_alert_sender_service():
+    """Returns the shared alert sender service (mock if enabled, otherwise a placeholder)."""
+    return MockAlertSenderService(persist=settings.MOCK_PERSIST_TO_DISK) if settings.MOCK_ALERT_SENDER_ENABLED else None # Placeholder for real Alert Sender
+
+def _archive_attachment_sync(google_drive_service, attachment, target_folder_name: str):
+    """Decodes one parsed email attachment and archives it to Google Drive (or mock)."""
+    with attachment.open() as attachment_stream:
+        google_drive_service.archive_attachment(attachment.filename, attachment_stream, target_folder_name=target_folder_name)
+
+async def _archive_attachment(google_drive_service, attachment, target_folder_name: str):
+    """Archives an attachment on the bounded I/O pool so the upload does not block the event loop."""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(get_io_pool(), _archive_attachment_sync, google_drive_service, attachment, target_folder_name)
+
+async def _post_alert(alert_sender_service, message: str, channel: str):
+    """Posts an internal alert and waits until it has been written."""
+    await alert_sender_service.send_alert(message, channel=channel)
+    # Alerts are written by a background task; wait for it before the loop can shut down
+    await alert_sender_service.flush()
+
+async def process_rfq_email(raw_email_content: bytes):
     """
     Processes an incoming Request for Quotation (RFQ) email.
 
@@ -35,6 +117,12 @@ def process_rfq_email(raw_email_content: bytes):
         raw_email_content (bytes): The raw byte content of the RFQ email.
     """
     print("\n--- Processing Incoming RFQ Email ---")
+    llm_service = get_llm_service()
+    google_sheets_service = get_google_sheets_service()
+    salesforce_crm_service = get_salesforce_crm_service()
+    google_drive_service = get_google_drive_service()
+    email_sender_service = get_email_sender_service()
+    alert_sender_service = get_alert_sender_service()
 
     # 1. Parse Email
     parsed_email = email_parser.parse_email(raw_email_content)
@@ -49,50 +137,93 @@ def process_rfq_email(raw_email_content: bytes):
     extracted_fields = llm_service.extract_fields(subject, body_plain) # This will call mock if enabled
     print(f"Extracted Fields: {extracted_fields}")
 
+    # Read the clock once; every date in this RFQ derives from it
+    now = datetime.datetime.now()
+    today_iso, close_date_iso = _rfq_dates(now.date())
+
+    # Steps 3-7 only depend on the extracted fields, so they run concurrently; one failing
+    # side effect is logged without cancelling the others
+    side_effects = []
+    side_effect_names = []
+
     # 3. Write Row to Google Sheets (or mock)
     if google_sheets_service:
         sheet_row = {
-            "Timestamp": datetime.datetime.now().isoformat(),
+            "Timestamp": now.isoformat(),
             "Subject": subject,
             "Sender": sender,
             **extracted_fields
         }
-        google_sheets_service.append_row(sheet_row)
+        side_effects.append(google_sheets_service.append_row(sheet_row))
+        side_effect_names.append("Google Sheets row")
 
     # 4. Create Opportunity in Salesforce (or mock)
     if salesforce_crm_service:
-        opportunity_name = f"RFQ: {extracted_fields.get('product', 'Unknown Product')} from {extracted_fields.get('contact_person', 'Unknown Client')}"
+        opportunity_name = OPPORTUNITY_NAME_TEMPLATE.format_map(ChainMap(extracted_fields, OPPORTUNITY_NAME_DEFAULTS))
         opportunity_data = {
             "Name": opportunity_name,
             "StageName": "Qualification",
-            "CloseDate": (datetime.date.today() + datetime.timedelta(weeks=4)).isoformat(), # Estimate 4 weeks out
-            "Description": f"RFQ for {extracted_fields.get('quantity', '')} {extracted_fields.get('product', '')}. Needed in {extracted_fields.get('location', '')} within {extracted_fields.get('delivery_time', '')}. Contact: {extracted_fields.get('contact_email', '')}",
+            "CloseDate": close_date_iso, # Estimate 4 weeks out
+            "Description": OPPORTUNITY_DESCRIPTION_TEMPLATE.format_map(SafeDict(extracted_fields)),
             "Amount": None # Amount could be estimated by LLM or left blank for manual input
         }
-        salesforce_crm_service.create_opportunity(opportunity_data)
+        side_effects.append(salesforce_crm_service.create_opportunity(opportunity_data))
+        side_effect_names.append("Salesforce opportunity")
 
     # 5. Archive Attachments to Drive (or mock)
     if google_drive_service and attachments:
+        target_folder_name = f"RFQ_{today_iso}"
         for attachment in attachments:
-            google_drive_service.archive_attachment(attachment['filename'], attachment['payload'], target_folder_name=f"RFQ_{datetime.date.today().isoformat()}")
+            side_effects.append(_archive_attachment(google_drive_service, attachment, target_folder_name))
+            side_effect_names.append(f"Drive archive of '{attachment.filename}'")
 
     # 6. Auto-reply to Client (AR/EN) (or mock)
     if email_sender_service and extracted_fields.get('contact_email'):
         reply_subject = f"Re: {subject}"
-        reply_body_ar = """مرحباً [اسم العميل],\n\nشكراً لاستفسارك بخصوص [المنتج]. لقد استلمنا طلبك وسنتواصل معك قريباً.\n\nمع خالص التقدير،\nفريق العروف\n""".replace('[اسم العميل]', extracted_fields.get('contact_person', 'عميلنا العزيز')).replace('[المنتج]', extracted_fields.get('product', 'طلبك'))
-
-        reply_body_en = f"""Hello {extracted_fields.get('contact_person', 'Valued Client')},\n\nThank you for your inquiry regarding {extracted_fields.get('product', 'your request')}. We have received your request and will get back to you shortly.\n\nBest regards,\nAlrouf Team\n"""
-
-        # For simplicity, sending English auto-reply for now
-        email_sender_service.send_email(extracted_fields['contact_email'], reply_subject, reply_body_en)
+        # Only the language actually sent is rendered
+        defaults = REPLY_DEFAULTS[REPLY_LANGUAGE]
+        reply_body = REPLY_TEMPLATES[REPLY_LANGUAGE].format(
+            name=extracted_fields.get('contact_person', defaults['name']),
+            product=extracted_fields.get('product', defaults['product']),
+        )
+        side_effects.append(email_sender_service.send_email(extracted_fields['contact_email'], reply_subject, reply_body))
+        side_effect_names.append("auto-reply")
 
     # 7. Post Internal Alert (Slack/Teams) (or mock)
     if alert_sender_service:
         alert_message = f"New RFQ received: '{subject}' from {sender}. Fields extracted: {extracted_fields.get('product')}, {extracted_fields.get('quantity')}."
-        alert_sender_service.send_alert(alert_message, channel="#rfq_alerts")
+        side_effects.append(_post_alert(alert_sender_service, alert_message, channel="#rfq_alerts"))
+        side_effect_names.append("internal alert")
+
+    results = await asyncio.gather(*side_effects, return_exceptions=True)
+    for name, result in zip(side_effect_names, results):
+        if isinstance(result, BaseException):
+            logger.error("RFQ side effect failed: %s", name, exc_info=result)
+
+    # Sheets rows and CRM opportunities are buffered in memory; write them out before returning
+    if google_sheets_service:
+        await google_sheets_service.flush()
+    if salesforce_crm_service:
+        await salesforce_crm_service.flush()
 
     print("--- RFQ Email Processing Complete ---\n")
 
+async def close_services():
+    """
+    Flushes and closes the shared services that keep their log files open.
+
+    Call it once, at shutdown, on the event loop that processed the emails.
+    """
+    google_sheets_service = get_google_sheets_service()
+    salesforce_crm_service = get_salesforce_crm_service()
+    alert_sender_service = get_alert_sender_service()
+    if google_sheets_service:
+        google_sheets_service.close()
+    if salesforce_crm_service:
+        salesforce_crm_service.close()
+    if alert_sender_service:
+        await alert_sender_service.aclose()
+
 # Example Usage with a mock email
 if __name__ == "__main__":
     # The 'datetime' module is already imported at the top of the file.
@@ -109,11 +240,17 @@ if __name__ == "__main__":
         attachments=[("specs.pdf", test_attachment_content)]
     )
 
-    process_rfq_email(mock_raw_email)
+    async def run_demo():
+        try:
+            await process_rfq_email(mock_raw_email)
+        finally:
+            await close_services()
+
+    asyncio.run(run_demo())
 
     print("\n--- Verification of Mock Outputs ---")
-    if settings.MOCK_GOOGLE_SHEETS_ENABLED: print(f"Check mock_sheets_log.json for Sheets output.")
-    if settings.MOCK_SALESFORCE_ENABLED: print(f"Check crm_mock_log.json for CRM opportunity.")
-    if settings.MOCK_GOOGLE_DRIVE_ENABLED: print(f"Check {google_drive_service.get_mock_folder_path()} for archived attachments.")
+    if settings.MOCK_GOOGLE_SHEETS_ENABLED: print(f"Check mock_sheets_log.jsonl for Sheets output.")
+    if settings.MOCK_SALESFORCE_ENABLED: print(f"Check crm_mock_log.jsonl for CRM opportunity.")
+    if settings.MOCK_GOOGLE_DRIVE_ENABLED: print(f"Check {get_google_drive_service().get_mock_folder_path()} for archived attachments.")
     if settings.MOCK_EMAIL_SENDER_ENABLED: print(f"Check auto_reply_sample.txt for client auto-reply.")
     if settings.MOCK_ALERT_SENDER_ENABLED: print(f"Check internal_alert_log.txt for internal alerts.")
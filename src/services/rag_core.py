@@ -1,7 +1,16 @@
+import hashlib
+import mmap
 import os
+import pickle
+import sqlite3
+import threading
 import time
 import numpy as np
-from typing import List, Dict, Any
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache, partial
+from typing import List, Dict, Any, Optional, Tuple
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 # Mock FAISS for planning, actual FAISS will be imported if installed
@@ -11,10 +20,160 @@ try:
 except ImportError:
     faiss = None
     FAISS_AVAILABLE = False
-    print("Warning: FAISS not installed. Using mock vector search. Please install faiss-cpu or faiss-gpu.")
+    print("Warning: FAISS not installed. Using exact vector search. Please install faiss-cpu or faiss-gpu.")
+
+if FAISS_AVAILABLE:
+    # FAISS 1.8+ prefetches neighbor vectors during the HNSW graph walk, and the SIMD build
+    # variants (AVX2/AVX-512 on x86, NEON on ARM) vectorize the distance kernels
+    _faiss_version = tuple(int(part) for part in faiss.__version__.split('.')[:2] if part.isdigit())
+    if _faiss_version < (1, 8):
+        print(f"Warning: FAISS {faiss.__version__} predates the HNSW prefetch kernels. Please upgrade to faiss-cpu>=1.8.")
+    _faiss_compile_options = faiss.get_compile_options().split() if hasattr(faiss, 'get_compile_options') else []
+    if not {'AVX2', 'AVX512', 'NEON', 'SVE'} & set(_faiss_compile_options):
+        print("Warning: FAISS was loaded without SIMD kernels (AVX2/AVX-512/NEON); vector search will be slower.")
 
 # FIX: Changed to a relative import to correctly reference llm_utils within the same 'services' package
-from .llm_utils import get_mock_embedding, get_llm_response_rag
+from .llm_utils import MOCK_EMBEDDER_ID, MOCK_EMBEDDING_DIM, get_mock_embedding_into, get_mock_embeddings_batch, get_llm_response_rag
+from .text_chunker import FastChunker
+from .rag_kernels import exact_top_k
+
+# FAISS runs its SIMD distance kernels on whole blocks of this many dimensions
+_SIMD_DIMENSION_MULTIPLE = 16
+
+# Accepted values of RAGCore's index_type argument
+_INDEX_TYPES = ("auto", "flat", "sq8", "hnsw", "ivf")
+
+# Accepted values of RAGCore's chunker argument
+_CHUNKERS = ("recursive", "fast")
+
+# Bumped whenever the cached chunk, embedding or index format changes
+_PIPELINE_CACHE_VERSION = 2
+
+# Keys per SQLite "IN (...)" lookup, below the default host-parameter limit of older SQLite builds
+_SQLITE_MAX_PARAMS = 900
+
+# Below this corpus size (in characters) chunking runs in-process
+_PARALLEL_CHUNKING_MIN_CHARS = 1_000_000
+
+@lru_cache(maxsize=None)
+def _get_text_splitter(chunk_size: int, chunk_overlap: int, chunker: str = "recursive"):
+    """Returns a text splitter for the given settings, built once per worker process."""
+    if chunker == "fast":
+        return FastChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        is_separator_regex=False,
+    )
+
+def _split_text(text: str, chunk_size: int, chunk_overlap: int, chunker: str = "recursive") -> List[str]:
+    """Splits one document's text into chunks; module-level so worker processes can run it."""
+    return _get_text_splitter(chunk_size, chunk_overlap, chunker).split_text(text)
+
+@dataclass(frozen=True, slots=True)
+class Chunk:
+    """A single document chunk, materialized on demand from RAGCore's per-chunk arrays."""
+    text: str
+    source: str
+    chunk_id: str
+
+class _QueryCache:
+    """
+    A two-tier cache of query responses.
+
+    The exact tier is an LRU map from (query text, language, top_k) to the response. The
+    optional semantic tier keeps the normalized embeddings of recent queries in a ring
+    buffer and, on an exact miss, returns the response of the most similar earlier query
+    with the same language and top_k if its cosine similarity reaches `threshold`. A
+    semantic hit is the answer to a different query, quoted under that query's text.
+    """
+    __slots__ = ("max_size", "threshold", "_exact", "_embeddings", "_entries", "_next", "_lock")
+
+    def __init__(self, max_size: int, dimension: int, threshold: Optional[float]):
+        self.max_size = max_size
+        self.threshold = threshold
+        self._exact: "OrderedDict[Tuple[str, str, int], Dict[str, Any]]" = OrderedDict()
+        # Semantic tier: one embedding row per slot, and its (language, top_k, response)
+        self._embeddings = np.zeros((max_size if threshold is not None else 0, dimension), dtype=np.float32)
+        self._entries: List[Tuple[str, int, Dict[str, Any]]] = []
+        self._next = 0 # Ring buffer slot that is overwritten next
+        self._lock = threading.Lock()
+
+    def get_exact(self, key: Tuple[str, str, int]) -> Optional[Dict[str, Any]]:
+        """Returns the response cached for exactly this query, or None."""
+        with self._lock:
+            response = self._exact.get(key)
+            if response is not None:
+                self._exact.move_to_end(key)
+            return response
+
+    def get_similar(self, query_embedding: np.ndarray, language: str, top_k: int) -> Optional[Dict[str, Any]]:
+        """Returns the response of the most similar cached query above the threshold, or None."""
+        if self.threshold is None:
+            return None
+        with self._lock:
+            if not self._entries:
+                return None
+            # Rows are unit vectors, so one matrix-vector product gives every cosine similarity
+            similarities = self._embeddings[:len(self._entries)] @ query_embedding
+            for slot in np.argsort(similarities)[::-1]:
+                if similarities[slot] < self.threshold:
+                    return None
+                entry_language, entry_top_k, response = self._entries[slot]
+                if entry_language == language and entry_top_k == top_k:
+                    return response
+            return None
+
+    def put(self, key: Tuple[str, str, int], query_embedding: np.ndarray, response: Dict[str, Any]):
+        """Caches a query's response in both tiers."""
+        with self._lock:
+            self._exact[key] = response
+            self._exact.move_to_end(key)
+            if len(self._exact) > self.max_size:
+                self._exact.popitem(last=False)
+            if self.threshold is not None:
+                self._embeddings[self._next] = query_embedding
+                entry = (key[1], key[2], response)
+                if self._next < len(self._entries):
+                    self._entries[self._next] = entry
+                else:
+                    self._entries.append(entry)
+                self._next = (self._next + 1) % self.max_size
+
+def _cached_copy(response: Dict[str, Any]) -> Dict[str, Any]:
+    """Copies a cached response for a caller, keeping the latency and cost of the original answer."""
+    return {
+        **response,
+        "citations": list(response["citations"]),
+        "retrieved_chunks": list(response["retrieved_chunks"]),
+    }
+
+def set_faiss_threads(num_threads: int) -> None:
+    """
+    Sets the number of OpenMP threads FAISS uses for searches and index builds.
+
+    The setting is process-wide, so it is meant to be called once at application start-up
+    (see `main` in rag_service.py) rather than toggled around individual calls.
+
+    Args:
+        num_threads (int): The OpenMP thread count. Ignored when FAISS is not installed.
+    """
+    if FAISS_AVAILABLE:
+        faiss.omp_set_num_threads(num_threads)
+
+def normalize_embeddings(embeddings: np.ndarray) -> None:
+    """
+    L2-normalizes the rows of a float32 embedding matrix in place.
+
+    Args:
+        embeddings (np.ndarray): A C-contiguous float32 array of shape (n, d).
+    """
+    if FAISS_AVAILABLE:
+        faiss.normalize_L2(embeddings)
+        return
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    np.divide(embeddings, norms, out=embeddings, where=norms > 0)
 
 class RAGCore:
     """
@@ -23,7 +182,24 @@ class RAGCore:
     Manages document ingestion, chunking, embedding, indexing (using FAISS if available),
     and querying to retrieve relevant context for an LLM.
     """
-    def __init__(self, document_paths: List[str], chunk_size: int = 500, chunk_overlap: int = 50):
+    def __init__(
+        self,
+        document_paths: List[str],
+        chunk_size: int = 500,
+        chunk_overlap: int = 50,
+        hnsw_min_vectors: int = 1000,
+        hnsw_m: int = 32,
+        hnsw_ef_construction: int = 40,
+        hnsw_ef_search: int = 16,
+        sq_min_vectors: int = 10_000,
+        index_type: str = "auto",
+        gpu_min_vectors: Optional[int] = 50_000,
+        cache_dir: Optional[str] = None,
+        embedding_cache_path: Optional[str] = None,
+        chunker: str = "recursive",
+        query_cache_size: int = 0,
+        semantic_cache_threshold: Optional[float] = None,
+    ):
         """
         Initializes the RAGCore pipeline.
 
@@ -31,21 +207,73 @@ class RAGCore:
             document_paths (List[str]): A list of file paths to the documents to be ingested.
             chunk_size (int, optional): The maximum size of text chunks. Defaults to 500.
             chunk_overlap (int, optional): The overlap between consecutive text chunks. Defaults to 50.
+            hnsw_min_vectors (int, optional): Corpora with more chunks than this are indexed with
+                HNSW instead of an exact flat index. Defaults to 1000.
+            hnsw_m (int, optional): Number of HNSW graph neighbors per vector. Defaults to 32.
+            hnsw_ef_construction (int, optional): HNSW search depth while building. Defaults to 40.
+            hnsw_ef_search (int, optional): HNSW search depth per query; higher values trade
+                latency for recall. Defaults to 16.
+            sq_min_vectors (int, optional): Corpora with more chunks than this are stored 8-bit
+                scalar-quantized in the HNSW index, cutting vector memory 4x. Defaults to 10000.
+            index_type (str, optional): "auto" picks flat, HNSW or quantized HNSW by corpus size
+                using the thresholds above; "flat", "hnsw" and "ivf" force that index type, and
+                "sq8" an exact scan over 8-bit scalar-quantized vectors, a quarter of the flat
+                index's memory. Defaults to "auto".
+            gpu_min_vectors (Optional[int], optional): Flat and IVF indexes with more chunks than
+                this are moved to the first GPU when one is available. A GPU only pays off for
+                batched searches, so use `query_batch` with it. None keeps the index on the CPU.
+                Defaults to 50000.
+            cache_dir (Optional[str], optional): Directory in which the built index, chunks and
+                embeddings are persisted. A later pipeline over the same unchanged files and
+                settings memory-maps them instead of rebuilding. Defaults to None (no caching).
+            embedding_cache_path (Optional[str], optional): SQLite file that stores chunk embeddings
+                by content hash, so unchanged chunks are not re-embedded when the corpus is
+                re-indexed. Defaults to None (no caching).
+            chunker (str, optional): "recursive" uses LangChain's RecursiveCharacterTextSplitter;
+                "fast" uses the single-pass `FastChunker`, which is much quicker on large corpora
+                but may place chunk boundaries differently. Defaults to "recursive".
+            query_cache_size (int, optional): The number of recent `query` responses kept, keyed
+                by query text, language and top_k. A hit reports the latency and cost of the
+                original answer. Defaults to 0 (no caching).
+            semantic_cache_threshold (Optional[float], optional): When set, a query that misses the
+                exact cache is answered from the most similar cached query if their embeddings'
+                cosine similarity is at least this value (e.g. 0.9). The answer then belongs to a
+                different query, so a loose threshold can return a wrong answer; this is only
+                meaningful with semantic embeddings. Requires `query_cache_size` > 0. Defaults
+                to None (exact matches only).
         """
         self.document_paths = document_paths
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            length_function=len,
-            is_separator_regex=False,
-        )
+        self.hnsw_min_vectors = hnsw_min_vectors
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construction = hnsw_ef_construction
+        self.hnsw_ef_search = hnsw_ef_search
+        self.sq_min_vectors = sq_min_vectors
+        if index_type not in _INDEX_TYPES:
+            raise ValueError(f"index_type must be one of {_INDEX_TYPES}, got '{index_type}'.")
+        self.index_type = index_type
+        self.gpu_min_vectors = gpu_min_vectors
+        self._gpu_resources = None # Kept alive for as long as the GPU index uses it
+        self.cache_dir = cache_dir
+        self.embedding_cache_path = embedding_cache_path
+        if chunker not in _CHUNKERS:
+            raise ValueError(f"chunker must be one of {_CHUNKERS}, got '{chunker}'.")
+        self.chunker = chunker
+        self.text_splitter = _get_text_splitter(self.chunk_size, self.chunk_overlap, self.chunker)
         self.documents = [] # List of {'text': ..., 'source': ...}
-        self.chunks = []    # List of {'text': ..., 'source': ...}
         self.embeddings = []
         self.index = None
-        self.source_map = {}
+        # Chunks are stored as parallel arrays rather than one dict per chunk
+        self._chunk_texts: List[str] = []
+        self._chunk_sources = np.empty(0, dtype=np.int32)  # Source id per chunk
+        self._chunk_ordinals = np.empty(0, dtype=np.int32) # Position of each chunk in its document
+        self._source_names: List[str] = []                 # Source filename per source id
+        self._query_buffers = threading.local()           # One reusable query vector per thread
+        self._query_cache = (
+            _QueryCache(query_cache_size, MOCK_EMBEDDING_DIM, semantic_cache_threshold)
+            if query_cache_size > 0 else None
+        )
 
         self._initialize_pipeline()
 
@@ -57,6 +285,13 @@ class RAGCore:
         start_time = time.time()
         print("\n--- RAG Pipeline Initialization ---")
 
+        cache_prefix = self._cache_prefix() if self.cache_dir and FAISS_AVAILABLE else None
+        if cache_prefix and self._load_cached_pipeline(cache_prefix):
+            self._move_index_to_gpu()
+            print(f"Loaded cached index with {self.num_chunks} chunks from {self.cache_dir}.")
+            print(f"Pipeline initialized in {time.time() - start_time:.2f} seconds.\n")
+            return
+
         # Ingest
         print("Ingesting documents...")
         self.documents = self.load_documents()
@@ -64,12 +299,12 @@ class RAGCore:
 
         # Chunk
         print("Chunking documents...")
-        self.chunks = self.chunk_documents(self.documents)
-        print(f"Created {len(self.chunks)} chunks.")
+        chunk_texts = self.chunk_documents(self.documents)
+        print(f"Created {len(chunk_texts)} chunks.")
 
         # Embed
         print("Generating embeddings...")
-        self.embeddings = self.get_embeddings(self.chunks)
+        self.embeddings = self.get_embeddings(chunk_texts)
         print(f"Generated {len(self.embeddings)} embeddings.")
 
         # Index
@@ -77,9 +312,147 @@ class RAGCore:
         self.index = self.build_faiss_index(self.embeddings)
         print("FAISS index built.")
 
+        if cache_prefix and self.index is not None:
+            self._save_pipeline_cache(cache_prefix)
+        # After saving, since only CPU indexes can be serialized
+        self._move_index_to_gpu()
+
         end_time = time.time()
         print(f"Pipeline initialized in {end_time - start_time:.2f} seconds.\n")
 
+    @property
+    def num_chunks(self) -> int:
+        """The number of chunks in the pipeline."""
+        return len(self._chunk_texts)
+
+    def get_chunk(self, position: int) -> Chunk:
+        """
+        Materializes the chunk at a position in the index.
+
+        Args:
+            position (int): The chunk's position, as returned by an index search.
+
+        Returns:
+            Chunk: The chunk's text, source filename and chunk id.
+        """
+        source = self._source_names[self._chunk_sources[position]]
+        return Chunk(
+            text=self._chunk_texts[position],
+            source=source,
+            chunk_id=f"{source}_chunk_{self._chunk_ordinals[position]}",
+        )
+
+    @property
+    def chunks(self) -> List[Chunk]:
+        """All chunks in index order. Each access materializes a new list."""
+        return [self.get_chunk(i) for i in range(self.num_chunks)]
+
+    @property
+    def source_map(self) -> Dict[str, str]:
+        """Maps each chunk id to its source filename. Each access builds a new dict."""
+        return {chunk.chunk_id: chunk.source for chunk in self.chunks}
+
+    def _move_index_to_gpu(self):
+        """
+        Moves a large index to the first GPU, where a batched search becomes one large
+        matrix product. Single queries are faster on the CPU, so small corpora stay there.
+
+        Only flat and IVF indexes have GPU implementations; other index types (HNSW, scalar
+        quantized) stay on the CPU without attempting the transfer, as does a failed transfer.
+        """
+        if (
+            self.index is None
+            or not isinstance(self.index, (faiss.IndexFlat, faiss.IndexIVF))
+            or self.gpu_min_vectors is None
+            or self.index.ntotal <= self.gpu_min_vectors
+            or not hasattr(faiss, 'StandardGpuResources')
+            or faiss.get_num_gpus() == 0
+        ):
+            return
+        try:
+            resources = faiss.StandardGpuResources()
+            self.index = faiss.index_cpu_to_gpu(resources, 0, self.index)
+            self._gpu_resources = resources
+            print(f"Moved FAISS index with {self.index.ntotal} vectors to GPU 0.")
+        except Exception as e:
+            print(f"Keeping FAISS index on the CPU: {e}")
+
+    def _cache_prefix(self) -> str:
+        """
+        Builds the cache file prefix from a fingerprint of the corpus and pipeline settings.
+
+        The fingerprint covers each document's path, size and modification time, so editing
+        a document (or changing the chunking or index settings) selects a fresh cache entry.
+
+        Returns:
+            str: The path prefix of the cache files in `cache_dir`.
+        """
+        fingerprint = hashlib.blake2b(digest_size=16)
+        fingerprint.update(repr((
+            _PIPELINE_CACHE_VERSION, MOCK_EMBEDDER_ID, self.chunk_size, self.chunk_overlap,
+            self.hnsw_min_vectors, self.hnsw_m, self.hnsw_ef_construction, self.sq_min_vectors,
+            self.index_type, self.chunker,
+        )).encode('utf-8'))
+        for path in self.document_paths:
+            try:
+                stat = os.stat(path)
+                file_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                file_key = (os.path.abspath(path), None, None)
+            fingerprint.update(repr(file_key).encode('utf-8'))
+        return os.path.join(self.cache_dir, fingerprint.hexdigest())
+
+    def _load_cached_pipeline(self, cache_prefix: str) -> bool:
+        """
+        Loads a persisted index, its chunks and its embeddings, memory-mapping the large files
+        so that workers on the same host share them through the page cache.
+
+        `documents` is left empty, since only the chunks are needed for querying.
+
+        Args:
+            cache_prefix (str): The cache file prefix from `_cache_prefix`.
+
+        Returns:
+            bool: True if the cache entry was loaded, False if it does not exist or is unreadable.
+        """
+        index_path = cache_prefix + ".faiss"
+        if not os.path.exists(index_path):
+            return False
+        try:
+            with open(cache_prefix + ".chunks.pkl", 'rb') as f:
+                self._chunk_texts, self._chunk_sources, self._chunk_ordinals, self._source_names = pickle.load(f)
+            self.embeddings = np.load(cache_prefix + ".npy", mmap_mode='r')
+            self.index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP)
+        except Exception as e:
+            print(f"Error loading cached index {index_path}: {e}")
+            self._chunk_texts, self._source_names, self.embeddings, self.index = [], [], [], None
+            self._chunk_sources = np.empty(0, dtype=np.int32)
+            self._chunk_ordinals = np.empty(0, dtype=np.int32)
+            return False
+        if hasattr(self.index, 'hnsw'):
+            self.index.hnsw.efSearch = self.hnsw_ef_search
+        return True
+
+    def _save_pipeline_cache(self, cache_prefix: str):
+        """
+        Persists the built index with its chunks and embeddings under `cache_prefix`.
+
+        The index file is written last and moved into place atomically, because its
+        presence marks the cache entry as complete.
+
+        Args:
+            cache_prefix (str): The cache file prefix from `_cache_prefix`.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(cache_prefix + ".chunks.pkl", 'wb') as f:
+            pickle.dump(
+                (self._chunk_texts, self._chunk_sources, self._chunk_ordinals, self._source_names),
+                f, protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        np.save(cache_prefix + ".npy", self.embeddings)
+        faiss.write_index(self.index, cache_prefix + ".faiss.tmp")
+        os.replace(cache_prefix + ".faiss.tmp", cache_prefix + ".faiss")
+
     def load_documents(self) -> List[Dict[str, str]]:
         """
         Loads text content from the specified document paths.
@@ -88,72 +461,219 @@ class RAGCore:
             List[Dict[str, str]]: A list of dictionaries, each containing
                                   'text' (content) and 'source' (filename) of a document.
         """
-        loaded_docs = []
-        for path in self.document_paths:
-            try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    loaded_docs.append({'text': content, 'source': os.path.basename(path)})
-            except Exception as e:
-                print(f"Error loading {path}: {e}")
-        return loaded_docs
+        if not self.document_paths:
+            return []
+        # File reads release the GIL, so a thread pool overlaps their I/O latency
+        with ThreadPoolExecutor(max_workers=min(32, len(self.document_paths))) as executor:
+            results = executor.map(self._read_document, self.document_paths)
+            return [doc for doc in results if doc is not None]
+
+    @staticmethod
+    def _read_document(path: str) -> Optional[Dict[str, str]]:
+        """
+        Reads one document file.
+
+        The file is memory-mapped and decoded straight from the mapping, so its bytes live in
+        the page cache rather than in a second heap copy next to the decoded text. Newlines
+        are normalized as in text mode.
+
+        Args:
+            path (str): The path of the document.
+
+        Returns:
+            Optional[Dict[str, str]]: The document's 'text' and 'source' (filename),
+                                      or None if the file could not be read.
+        """
+        try:
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    text = ''  # Empty files cannot be mapped
+                else:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        text = str(mapped, 'utf-8')
+            if '\r' in text:
+                text = text.replace('\r\n', '\n').replace('\r', '\n')
+            return {'text': text, 'source': os.path.basename(path)}
+        except Exception as e:
+            print(f"Error loading {path}: {e}")
+            return None
 
-    def chunk_documents(self, documents: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    def chunk_documents(self, documents: List[Dict[str, str]]) -> List[str]:
         """
         Splits loaded documents into smaller, overlapping chunks.
 
+        Corpora of at least `_PARALLEL_CHUNKING_MIN_CHARS` characters are split across a
+        process pool; smaller ones are split in-process, where worker start-up would dominate.
+
         Args:
             documents (List[Dict[str, str]]): A list of documents, each with 'text' and 'source'.
 
         Returns:
-            List[Dict[str, str]]: A list of document chunks, each with 'text', 'source', and 'chunk_id'.
+            List[str]: The chunk texts in index order. Their sources and positions within their
+                documents are stored alongside, in the pipeline's per-chunk arrays.
         """
-        all_chunks = []
-        for doc in documents:
-            texts = self.text_splitter.split_text(doc['text'])
-            for i, text in enumerate(texts):
-                chunk_id = f"{doc['source']}_chunk_{i}"
-                self.source_map[chunk_id] = doc['source'] # Map chunk_id to original source
-                all_chunks.append({'text': text, 'source': doc['source'], 'chunk_id': chunk_id})
-        return all_chunks
+        if len(documents) > 1 and sum(len(doc['text']) for doc in documents) >= _PARALLEL_CHUNKING_MIN_CHARS:
+            # Splitting is pure-Python CPU work, so large corpora are split in worker processes
+            workers = min(len(documents), max(1, (os.cpu_count() or 1) - 1))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                split_texts = list(executor.map(
+                    partial(_split_text, chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap,
+                            chunker=self.chunker),
+                    [doc['text'] for doc in documents],
+                ))
+        else:
+            split_texts = [self.text_splitter.split_text(doc['text']) for doc in documents]
+
+        # Sources are interned as small integer ids, so citations deduplicate integers, not strings
+        source_ids: Dict[str, int] = {}
+        doc_source_ids = [source_ids.setdefault(doc['source'], len(source_ids)) for doc in documents]
+        counts = [len(texts) for texts in split_texts]
+        self._chunk_texts = [text for texts in split_texts for text in texts]
+        self._chunk_sources = np.repeat(np.array(doc_source_ids, dtype=np.int32), counts)
+        self._chunk_ordinals = (
+            np.concatenate([np.arange(count, dtype=np.int32) for count in counts])
+            if counts else np.empty(0, dtype=np.int32)
+        )
+        self._source_names = list(source_ids)
+        return self._chunk_texts
 
-    def get_embeddings(self, chunks: List[Dict[str, str]]) -> np.ndarray:
+    def get_embeddings(self, texts: List[str]) -> np.ndarray:
         """
         Generates mock embeddings for each text chunk.
 
         Args:
-            chunks (List[Dict[str, str]]): A list of text chunks.
+            texts (List[str]): The chunk texts.
+
+        Returns:
+            np.ndarray: A NumPy array of L2-normalized float32 embeddings, one row per chunk.
+        """
+        if self.embedding_cache_path:
+            embeddings = self._get_embeddings_cached(texts)
+        else:
+            # One batched call fills the float32 matrix FAISS requires, without a per-chunk copy
+            embeddings = get_mock_embeddings_batch(texts)
+        normalize_embeddings(embeddings)
+        return embeddings
+
+    def _get_embeddings_cached(self, texts: List[str]) -> np.ndarray:
+        """
+        Embeds texts through the persistent embedding cache.
+
+        Texts are keyed by a BLAKE2b digest of their content. The database records the
+        `MOCK_EMBEDDER_ID` its vectors were made with; when that differs from the current
+        embedder (whose ID includes the dimension), the stored vectors are discarded rather
+        than served stale. Cached vectors are fetched with bulk SELECTs, only the missing
+        texts are passed to the embedder, and their vectors are inserted in one batch.
+
+        Args:
+            texts (List[str]): The chunk texts to embed.
 
         Returns:
-            np.ndarray: A NumPy array of float32 embeddings.
+            np.ndarray: A float32 array of shape (len(texts), d) with the raw (unnormalized) embeddings.
         """
-        embeddings_list = []
-        for chunk in chunks:
-            embeddings_list.append(get_mock_embedding(chunk['text']))
-        return np.array(embeddings_list).astype('float32') # FAISS requires float32
+        keys = [hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest() for text in texts]
+        with sqlite3.connect(self.embedding_cache_path) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            row = conn.execute("SELECT value FROM metadata WHERE name = 'embedder'").fetchone()
+            if row is None or row[0] != MOCK_EMBEDDER_ID:
+                conn.execute("DELETE FROM embeddings")
+                conn.execute("INSERT OR REPLACE INTO metadata (name, value) VALUES ('embedder', ?)", (MOCK_EMBEDDER_ID,))
+            cached = {}
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), _SQLITE_MAX_PARAMS):
+                batch = unique_keys[start:start + _SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                cached.update(conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch))
+
+            missing = [i for i, key in enumerate(keys) if key not in cached]
+            new_vectors = get_mock_embeddings_batch([texts[i] for i in missing])
+            dimension = new_vectors.shape[1]
+            embeddings = np.empty((len(texts), dimension), dtype=np.float32)
+            for i, key in enumerate(keys):
+                vector = cached.get(key)
+                if vector is not None:
+                    embeddings[i] = np.frombuffer(vector, dtype=np.float32)
+            if missing:
+                embeddings[missing] = new_vectors
+                conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings (key, vector) VALUES (?, ?)",
+                    ((keys[i], vector.tobytes()) for i, vector in zip(missing, new_vectors)),
+                )
+        conn.close()
+        return embeddings
 
     def build_faiss_index(self, embeddings: np.ndarray):
         """
         Builds a FAISS index from the generated embeddings.
 
+        The embeddings are L2-normalized, so vectors are ranked by inner product (cosine
+        similarity), which FAISS computes as a single matrix product. Small corpora use an
+        exact `IndexFlatIP`; above `hnsw_min_vectors` embeddings an `IndexHNSWFlat` graph
+        index keeps query time sub-linear in the corpus size, and above `sq_min_vectors` the
+        graph index stores 8-bit scalar-quantized vectors (`IndexHNSWSQ`). With
+        `index_type="ivf"`, an `IndexIVFFlat` clusters the vectors into nlist lists and
+        scans only nprobe of them per query. With `index_type="sq8"`, an
+        `IndexScalarQuantizer` scans every vector exhaustively, stored in 8 bits per
+        dimension.
         If FAISS is not available or if there are no embeddings, a mock index (None) is returned.
+        A warning is printed when the embedding dimension is not a multiple of 16, since FAISS
+        then falls back to slower scalar distance kernels for part of each vector.
 
         Args:
             embeddings (np.ndarray): A NumPy array of float32 embeddings.
 
         Returns:
-            faiss.IndexFlatL2 or None: The built FAISS index or None if FAISS is not available.
+            faiss.Index or None: The built FAISS index or None if FAISS is not available.
         """
         if not FAISS_AVAILABLE:
-            print("FAISS not available. Returning mock index.")
-            return None # Or implement a simple numpy search
+            print("FAISS not available. Queries will use exact search.")
+            return None
 
         if embeddings.shape[0] == 0:
             print("No embeddings to build an index.")
             return None
 
+        # FAISS copies any input that is not C-contiguous float32; get_embeddings already
+        # returns that layout, so this only converts embeddings passed in by other callers
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
         dimension = embeddings.shape[1]
-        index = faiss.IndexFlatL2(dimension) # L2 distance index
+        if dimension % _SIMD_DIMENSION_MULTIPLE:
+            print(
+                f"Warning: Embedding dimension {dimension} is not a multiple of {_SIMD_DIMENSION_MULTIPLE}; "
+                "FAISS will use slower scalar distance kernels for the remainder."
+            )
+        num_vectors = embeddings.shape[0]
+        index_type = self.index_type
+        if index_type == "auto":
+            index_type = "hnsw" if num_vectors > self.hnsw_min_vectors else "flat"
+
+        if index_type == "ivf":
+            # nlist ~ 2*sqrt(N) inverted lists, of which nprobe are scanned per query,
+            # so a search visits about N * nprobe / nlist vectors
+            nlist = min(num_vectors, max(int(2 * np.sqrt(num_vectors)), 20))
+            quantizer = faiss.IndexFlatIP(dimension)
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+            index.train(embeddings)
+            index.nprobe = max(1, min(nlist // 4, 10))
+        elif index_type == "flat":
+            # The HNSW graph costs more than it saves on a small corpus
+            index = faiss.IndexFlatIP(dimension) # Inner product (cosine similarity) index
+        elif index_type == "sq8":
+            # Queries stay float32; the scan decodes the 8-bit codes inside the distance kernel
+            index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+            index.train(embeddings)
+        elif num_vectors > self.sq_min_vectors:
+            # 8-bit scalar quantization stores a quarter of the float32 bytes, so more of the
+            # vectors visited by the graph walk stay in cache; the quantizer is trained first
+            index = faiss.IndexHNSWSQ(dimension, faiss.ScalarQuantizer.QT_8bit, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = self.hnsw_ef_construction
+            index.hnsw.efSearch = self.hnsw_ef_search
+            index.train(embeddings)
+        else:
+            index = faiss.IndexHNSWFlat(dimension, self.hnsw_m, faiss.METRIC_INNER_PRODUCT) # Approximate search over a graph
+            index.hnsw.efConstruction = self.hnsw_ef_construction
+            index.hnsw.efSearch = self.hnsw_ef_search
         index.add(embeddings)
         return index
 
@@ -161,7 +681,7 @@ class RAGCore:
         """
         Executes a RAG query: retrieves relevant chunks, then generates an LLM answer.
 
-        Performs a vector search on the FAISS index (or mock search) to find top_k
+        Performs a vector search on the FAISS index (or an exact search) to find top_k
         most relevant chunks, then passes these chunks as context to the LLM to
         formulate an answer.
 
@@ -174,30 +694,97 @@ class RAGCore:
         Returns:
             Dict[str, Any]: A dictionary containing:
                 - "answer" (str): The LLM-generated answer.
-                - "citations" (List[str]): A list of source filenames for the retrieved context.
-                - "latency_ms" (float): Mock latency for LLM processing in milliseconds.
-                - "cost_usd" (float): Mock cost for LLM processing in USD.
+                - "citations" (List[str]): The distinct source filenames of the retrieved context,
+                  in retrieval order.
+                - "latency_ms" (float): Mock latency for LLM processing in milliseconds
+                  (that of the original answer for a cached response).
+                - "cost_usd" (float): Mock cost for LLM processing in USD (that of the original
+                  answer for a cached response).
                 - "retrieved_chunks" (List[str]): The text content of the retrieved chunks.
         """
-        query_embedding = np.array([get_mock_embedding(query_text)]).astype('float32')
+        cache_key = (query_text, language, top_k)
+        if self._query_cache is not None:
+            cached = self._query_cache.get_exact(cache_key)
+            if cached is not None:
+                return _cached_copy(cached)
+
+        # The query is embedded into a reused per-thread buffer instead of fresh arrays
+        query_embedding = getattr(self._query_buffers, 'buffer', None)
+        if query_embedding is None:
+            query_embedding = self._query_buffers.buffer = np.empty((1, MOCK_EMBEDDING_DIM), dtype=np.float32)
+        get_mock_embedding_into(query_text, query_embedding[0])
+        normalize_embeddings(query_embedding)
+        if self._query_cache is None:
+            return self._answer(query_text, self._search(query_embedding, top_k)[0], language)
+
+        cached = self._query_cache.get_similar(query_embedding[0], language, top_k)
+        if cached is not None:
+            return _cached_copy(cached)
+        response = self._answer(query_text, self._search(query_embedding, top_k)[0], language)
+        # The cache keeps its own copy, so a caller mutating the response cannot alter later hits
+        self._query_cache.put(cache_key, query_embedding[0], _cached_copy(response))
+        return response
+
+    def query_batch(self, queries: List[str], language: str = "en", top_k: int = 3) -> List[Dict[str, Any]]:
+        """
+        Executes several RAG queries with a single vector search.
+
+        The query embeddings are stacked into one (B, d) matrix and searched with one
+        `index.search` call, which amortizes FAISS's per-call overhead across the batch.
+
+        Args:
+            queries (List[str]): The user's query strings.
+            language (str, optional): The desired language for the LLM responses ('en' or 'ar').
+                                      Defaults to "en".
+            top_k (int, optional): The number of top relevant chunks to retrieve per query. Defaults to 3.
+
+        Returns:
+            List[Dict[str, Any]]: One response per query, in order, shaped like the result of `query`.
+        """
+        if not queries:
+            return []
+        query_embeddings = get_mock_embeddings_batch(queries)
+        normalize_embeddings(query_embeddings)
+        results = self._search(query_embeddings, top_k)
+        return [self._answer(query_text, indices, language) for query_text, indices in zip(queries, results)]
+
+    def _search(self, query_embeddings: np.ndarray, top_k: int) -> List[np.ndarray]:
+        """
+        Retrieves the top_k chunk positions for each row of a query embedding matrix.
+
+        Args:
+            query_embeddings (np.ndarray): Normalized float32 query embeddings of shape (B, d).
+            top_k (int): The number of top relevant chunks to retrieve per query.
 
+        Returns:
+            List[np.ndarray]: The retrieved chunk positions for each query, best first.
+        """
         if self.index is None or not FAISS_AVAILABLE:
-            print("FAISS index not available or built. Performing mock search.")
-            # Fallback to simple similarity if FAISS isn't there or if index is empty
-            # For a mock, just return a random chunk
-            if self.chunks:
-                retrieved_chunks_info = [self.chunks[np.random.randint(0, len(self.chunks))]]
-            else:
-                retrieved_chunks_info = []
-            distances = [0.0] * len(retrieved_chunks_info)
-        else:
-            # Perform search
-            distances, indices = self.index.search(query_embedding, top_k)
-            retrieved_chunks_info = [self.chunks[i] for i in indices[0] if i < len(self.chunks)]
-            distances = distances[0]
+            if not self._chunk_texts:
+                return [np.empty(0, dtype=np.int64) for _ in range(len(query_embeddings))]
+            print("FAISS index not available. Performing exact search.")
+            return list(exact_top_k(self.embeddings, query_embeddings, top_k))
+
+        # Perform search; FAISS pads rows with -1 when fewer than top_k chunks exist
+        _, indices = self.index.search(query_embeddings, top_k)
+        return [row[row >= 0] for row in indices]
+
+    def _answer(self, query_text: str, indices: np.ndarray, language: str) -> Dict[str, Any]:
+        """
+        Generates the LLM answer for a query from its retrieved chunks.
+
+        Args:
+            query_text (str): The user's query string.
+            indices (np.ndarray): Positions of the chunks retrieved for the query.
+            language (str): The desired language for the LLM response ('en' or 'ar').
 
-        context_texts = [chunk['text'] for chunk in retrieved_chunks_info]
-        citations = list(set([chunk['source'] for chunk in retrieved_chunks_info]))
+        Returns:
+            Dict[str, Any]: The query response (see `query`).
+        """
+        chunk_texts = self._chunk_texts
+        context_texts = [chunk_texts[i] for i in indices.tolist()]
+        # Citations follow retrieval order: best-matching source first
+        citations = [self._source_names[j] for j in dict.fromkeys(self._chunk_sources[indices].tolist())]
 
         llm_start_time = time.time()
         answer = get_llm_response_rag(query_text, context_texts, language=language)
@@ -212,5 +799,5 @@ class RAGCore:
             "citations": citations,
             "latency_ms": latency_ms,
             "cost_usd": cost_usd,
-            "retrieved_chunks": [chunk['text'] for chunk in retrieved_chunks_info]
+            "retrieved_chunks": context_texts
         }
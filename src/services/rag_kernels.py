@@ -0,0 +1,58 @@
+import numpy as np
+
+# Optional: JIT-compiled similarity kernel for the exact search used when FAISS is absent
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    njit = prange = None
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _inner_products(embeddings, query_embeddings):
+        """Scores every corpus row against every query, with corpus rows split across threads."""
+        num_queries = query_embeddings.shape[0]
+        num_vectors, dimension = embeddings.shape
+        scores = np.empty((num_queries, num_vectors), dtype=np.float32)
+        for i in prange(num_vectors):
+            for j in range(num_queries):
+                total = np.float32(0.0)
+                for d in range(dimension):
+                    total += embeddings[i, d] * query_embeddings[j, d]
+                scores[j, i] = total
+        return scores
+else:
+    def _inner_products(embeddings, query_embeddings):
+        """Scores every corpus row against every query with one float32 matrix product."""
+        return query_embeddings @ embeddings.T
+
+def exact_top_k(embeddings: np.ndarray, query_embeddings: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Finds the top_k most similar embeddings for each query by exact inner-product search.
+
+    Used when FAISS is unavailable. Scores come from a Numba kernel, compiled once and cached
+    on disk, when Numba is installed, and from one float32 matrix product otherwise;
+    `argpartition` then selects each row's top_k before only those are sorted.
+
+    Args:
+        embeddings (np.ndarray): Normalized float32 corpus embeddings of shape (N, d).
+        query_embeddings (np.ndarray): Normalized float32 query embeddings of shape (B, d).
+        top_k (int): The number of results per query.
+
+    Returns:
+        np.ndarray: An int array of shape (B, min(top_k, N)) with corpus row indices, best first.
+    """
+    k = min(top_k, embeddings.shape[0])
+    if k <= 0:
+        return np.empty((query_embeddings.shape[0], 0), dtype=np.int64)
+    scores = _inner_products(
+        np.ascontiguousarray(embeddings, dtype=np.float32),
+        np.ascontiguousarray(query_embeddings, dtype=np.float32),
+    )
+    if k < embeddings.shape[0]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(k), scores.shape).copy()
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=1)
@@ -1,7 +1,9 @@
 import os
 import time
-from services.rag_core import RAGCore
-from services.llm_utils import get_llm_response # For general chat, if needed
+# Relative imports, like rag_core's own, so the CLI runs as `python -m src.services.rag_service`
+from .rag_core import RAGCore, set_faiss_threads
+from .llm_utils import get_llm_response # For general chat, if needed
+from ..config import FAISS_OMP_THREADS
 
 def main():
     """
@@ -12,6 +14,9 @@ def main():
     answers augmented with retrieved context from the documents.
     """
     print("Starting RAG Knowledge Base CLI...")
+    # FAISS's OpenMP thread count is process-wide, so it is set once before any index is built
+    if FAISS_OMP_THREADS > 0:
+        set_faiss_threads(FAISS_OMP_THREADS)
 
     # Define document paths
     script_dir = os.path.dirname(__file__)
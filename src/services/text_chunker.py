@@ -0,0 +1,75 @@
+import bisect
+import numpy as np
+from typing import List
+
+# Chunks may end after a space or a newline, which covers paragraph breaks, line breaks,
+# sentence punctuation followed by a space, and plain word boundaries
+_SPACE = ord(' ')
+_NEWLINE = ord('\n')
+
+class FastChunker:
+    """
+    A single-pass alternative to `RecursiveCharacterTextSplitter`.
+
+    Candidate split offsets are found with one vectorized scan over the text's code points,
+    and chunks are then packed greedily by offset arithmetic: each chunk ends at the last
+    separator within `chunk_size` characters, and the next one starts at the first separator
+    inside the trailing `chunk_overlap` characters. Unlike the recursive splitter, all
+    separators rank equally, so chunk boundaries can differ from it.
+    """
+    __slots__ = ("chunk_size", "chunk_overlap")
+
+    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50):
+        """
+        Initializes the FastChunker.
+
+        Args:
+            chunk_size (int, optional): The maximum size of text chunks. Defaults to 500.
+            chunk_overlap (int, optional): The maximum overlap between consecutive chunks. Defaults to 50.
+
+        Raises:
+            ValueError: If `chunk_overlap` is not smaller than `chunk_size`.
+        """
+        if chunk_overlap >= chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size}).")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def split_text(self, text: str) -> List[str]:
+        """
+        Splits text into chunks of at most `chunk_size` characters.
+
+        Args:
+            text (str): The text to split.
+
+        Returns:
+            List[str]: The non-empty, whitespace-stripped chunks in document order.
+        """
+        length = len(text)
+        if length <= self.chunk_size:
+            stripped = text.strip()
+            return [stripped] if stripped else []
+
+        # UTF-32 gives one array element per character, so array indices are string offsets.
+        # A chunk may end (or the next one start) just past each separator.
+        codepoints = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+        # The packing loop probes one offset at a time, where bisect on a list beats NumPy scalars
+        cuts = (np.flatnonzero((codepoints == _SPACE) | (codepoints == _NEWLINE)) + 1).tolist()
+        chunks = []
+        start = 0
+        while start < length:
+            limit = start + self.chunk_size
+            if limit >= length:
+                end = length
+            else:
+                i = bisect.bisect_right(cuts, limit) - 1
+                # No separator inside the window: cut the text at the size limit
+                end = cuts[i] if i >= 0 and cuts[i] > start else limit
+            chunk = text[start:end].strip()
+            if chunk:
+                chunks.append(chunk)
+            if end == length:
+                break
+            j = bisect.bisect_left(cuts, end - self.chunk_overlap)
+            start = cuts[j] if j < len(cuts) and start < cuts[j] < end else end
+        return chunks
@@ -0,0 +1,39 @@
+import os
+import sys
+import pytest
+from src.services.rag_core import RAGCore
+
+# process_rfq_email runs as a script from src/ and imports `config` and `services` as
+# top-level modules, so the tests import it the same way
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+
+def pytest_configure(config):
+    # Registered here so the mark is known even when pytest-xdist is not installed
+    config.addinivalue_line(
+        "markers", "xdist_group(name): run the marked tests on the same pytest-xdist worker",
+    )
+
+@pytest.fixture(scope="session")
+def mock_data_dir(tmp_path_factory):
+    """Create temporary mock data files once per test session (once per xdist worker)."""
+    data_path = tmp_path_factory.mktemp("data", numbered=True)
+
+    doc1_en = data_path / "document1_en.txt"
+    doc1_en.write_text("The quick brown fox jumps over the lazy dog. Fox is an animal.")
+
+    doc2_ar = data_path / "document2_ar.txt"
+    doc2_ar.write_text("القط السريع البني يقفز فوق الكلب الكسول. الكلب حيوان.", encoding='utf-8')
+
+    return data_path
+
+@pytest.fixture(scope="session")
+def rag_core(mock_data_dir):
+    """
+    A RAG pipeline over both mock documents, embedded and indexed once per test session.
+    Without FAISS installed, RAGCore builds no index and answers with its exact search.
+    """
+    return RAGCore(document_paths=[
+        os.path.join(mock_data_dir, "document1_en.txt"),
+        os.path.join(mock_data_dir, "document2_ar.txt")
+    ])
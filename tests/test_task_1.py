@@ -1,5 +1,9 @@
 import os
+import asyncio
 import datetime
+import threading
+import types
+import pytest
 from src.config import settings
 from src.services.email_parser import EmailParser
 from mocks.mock_llm_service import MockLLMService
@@ -8,169 +12,297 @@ from mocks.mock_salesforce_crm import MockSalesforceCRMService
 from mocks.mock_google_drive import MockGoogleDriveService
 from mocks.mock_email_sender import MockEmailSenderService
 from mocks.mock_alert_sender import MockAlertSenderService
+# Imported the way the script imports itself, with src/ on sys.path (see conftest.py)
+import services.process_rfq_email as rfq
 
-# Initialize services (using mocks based on config)
-# In a real test suite, these would often be passed as fixtures
-# For this example, we'll initialize them once for the test function.
-email_parser = EmailParser()
-llm_service = MockLLMService()
-google_sheets_service = MockGoogleSheetsService()
-salesforce_crm_service = MockSalesforceCRMService()
-google_drive_service = MockGoogleDriveService()
-email_sender_service = MockEmailSenderService()
-alert_sender_service = MockAlertSenderService()
-
-def run_rfq_processing_logic(raw_email_content: bytes):
-    """
-    Encapsulates the core RFQ processing logic.
-    This function will be called by the test.
-    """
-    print("\n--- Processing Incoming RFQ Email ---")
-
-    # 1. Parse Email
-    parsed_email = email_parser.parse_email(raw_email_content)
-    subject = parsed_email['subject']
-    body_plain = parsed_email['body_plain']
-    sender = parsed_email['sender']
-    attachments = parsed_email['attachments']
-
-    print(f"Parsed Email - Subject: {subject}, From: {sender}")
-
-    # 2. Extract Fields using LLM (or mock)
-    extracted_fields = llm_service.extract_fields(subject, body_plain)
-    print(f"Extracted Fields: {extracted_fields}")
-
-    # 3. Write Row to Google Sheets (or mock)
-    if google_sheets_service:
-        sheet_row = {
-            "Timestamp": datetime.datetime.now().isoformat(),
-            "Subject": subject,
-            "Sender": sender,
-            **extracted_fields
-        }
-        google_sheets_service.append_row(sheet_row)
-
-    # 4. Create Opportunity in Salesforce (or mock)
-    if salesforce_crm_service:
-        opportunity_name = f"RFQ: {extracted_fields.get('product', 'Unknown Product')} from {extracted_fields.get('contact_person', 'Unknown Client')}"
-        opportunity_data = {
-            "Name": opportunity_name,
-            "StageName": "Qualification",
-            "CloseDate": (datetime.date.today() + datetime.timedelta(weeks=4)).isoformat(), # Estimate 4 weeks out
-            "Description": f"RFQ for {extracted_fields.get('quantity', '')} {extracted_fields.get('product', '')}. Needed in {extracted_fields.get('location', '')} within {extracted_fields.get('delivery_time', '')}. Contact: {extracted_fields.get('contact_email', '')}",
-            "Amount": None # Amount could be estimated by LLM or left blank for manual input
-        }
-        salesforce_crm_service.create_opportunity(opportunity_data)
-
-    # 5. Archive Attachments to Drive (or mock)
-    if google_drive_service and attachments:
-        for attachment in attachments:
-            google_drive_service.archive_attachment(attachment['filename'], attachment['payload'], target_folder_name=f"RFQ_{datetime.date.today().isoformat()}")
-
-    # 6. Auto-reply to Client (AR/EN) (or mock)
-    if email_sender_service and extracted_fields.get('contact_email'):
-        reply_subject = f"Re: {subject}"
-        # Use the extracted fields for a more personalized reply
-        contact_person = extracted_fields.get('contact_person', 'عميلنا العزيز')
-        product_name_ar = extracted_fields.get('product', 'طلبك')
-        product_name_en = extracted_fields.get('product', 'your request')
-
-        reply_body_ar = f"""مرحباً {contact_person},\n\nشكراً لاستفسارك بخصوص {product_name_ar}. لقد استلمنا طلبك وسنتواصل معك قريباً.\n\nمع خالص التقدير،\nفريق العروف\n"""
-        reply_body_en = f"""Hello {contact_person},\n\nThank you for your inquiry regarding {product_name_en}. We have received your request and will get back to you shortly.\n\nBest regards,\nAlrouf Team\n"""
-
-        # For simplicity, sending English auto-reply for now
-        email_sender_service.send_email(extracted_fields['contact_email'], reply_subject, reply_body_en)
-
-    # 7. Post Internal Alert (Slack/Teams) (or mock)
-    if alert_sender_service:
-        alert_message = f"New RFQ received: '{subject}' from {sender}. Fields extracted: {extracted_fields.get('product')}, {extracted_fields.get('quantity')}."
-        alert_sender_service.send_alert(alert_message, channel="#rfq_alerts")
-
-    print("--- RFQ Email Processing Complete ---\n")
-    return extracted_fields # Return extracted fields for assertions
-
-
-def test_process_rfq_email_workflow():
+TEST_SUBJECT = "RFQ — Streetlight Poles"
+TEST_BODY = """Hello Alrouf, please quote 120 pcs streetlight model ALR-SL-90W. Needed in Dammam within 4 weeks. Attach specs. Regards, Eng. Omar, +9665XXXX, omar@client.com"""
+TEST_ATTACHMENT_CONTENT = b"This is a dummy spec sheet content.\n" * 5
+
+@pytest.fixture
+def services(monkeypatch):
     """
-    Tests the end-to-end RFQ email processing workflow using mock services.
+    Injects fresh mock services into `process_rfq_email` through its service providers.
+    The mocks keep their records in memory only, so the test neither writes nor
+    re-reads log files.
     """
-    # Create a mock raw email with an attachment
-    test_subject = "RFQ — Streetlight Poles"
-    test_body = """Hello Alrouf, please quote 120 pcs streetlight model ALR-SL-90W. Needed in Dammam within 4 weeks. Attach specs. Regards, Eng. Omar, +9665XXXX, omar@client.com"""
-    test_attachment_content = b"This is a dummy spec sheet content.\n" * 5
+    services = types.SimpleNamespace(
+        llm_service=MockLLMService(),
+        google_sheets_service=MockGoogleSheetsService(persist=False),
+        salesforce_crm_service=MockSalesforceCRMService(persist=False),
+        google_drive_service=MockGoogleDriveService(persist=False),
+        email_sender_service=MockEmailSenderService(persist=False),
+        alert_sender_service=MockAlertSenderService(persist=False),
+    )
+    for name, service in vars(services).items():
+        monkeypatch.setattr(rfq, f"get_{name}", lambda service=service: service)
+    yield services
+    asyncio.run(rfq.close_services())
 
-    mock_raw_email = email_parser.create_mock_email(
-        subject=test_subject,
-        body=test_body,
+def create_rfq_email(subject: str = TEST_SUBJECT, body: str = TEST_BODY) -> bytes:
+    """Creates the raw RFQ email used by the tests, with one spec sheet attachment."""
+    return EmailParser().create_mock_email(
+        subject=subject,
+        body=body,
         sender="omar@client.com",
-        attachments=[("specs.pdf", test_attachment_content)]
+        attachments=[("specs.pdf", TEST_ATTACHMENT_CONTENT)]
     )
 
-    # Execute the processing logic
-    extracted_fields = run_rfq_processing_logic(mock_raw_email)
+
+def test_process_rfq_email_workflow(services):
+    """
+    Tests the end-to-end RFQ email processing workflow using mock services.
+    """
+    asyncio.run(rfq.process_rfq_email(create_rfq_email()))
 
     # --- Assertions to verify the workflow ---
     print("\n--- Verification of Mock Outputs with Assertions ---")
 
-    # Verify LLM extraction
-    assert extracted_fields["product"] == "streetlight model ALR-SL-90W"
-    assert extracted_fields["quantity"] == "120 pcs"
-    assert extracted_fields["contact_person"] == "Eng. Omar"
-    assert extracted_fields["contact_email"] == "omar@client.com"
-    
-    # Verify Google Sheets interaction (check if at least one entry exists and its content)
+    # Verify Google Sheets interaction (check the last appended row, which holds the LLM extraction)
     if settings.MOCK_GOOGLE_SHEETS_ENABLED:
-        # Load the mock sheets log and check the last entry
-        import json
-        with open(google_sheets_service.output_file, 'r') as f:
-            sheet_data = json.load(f)
-        assert len(sheet_data) > 0
-        last_entry = sheet_data[-1]
-        assert last_entry["Subject"] == test_subject
-        assert last_entry["Sender"] == "omar@client.com"
-        assert last_entry["product"] == "streetlight model ALR-SL-90W"
-        assert last_entry["contact_person"] == "Eng. Omar"
-        print(f"✅ Sheets output verified in {google_sheets_service.output_file}.")
+        sheet_columns = services.google_sheets_service.columns
+        assert services.google_sheets_service.num_rows == 1
+        assert sheet_columns["Subject"][-1] == TEST_SUBJECT
+        assert sheet_columns["Sender"][-1] == "omar@client.com"
+        assert sheet_columns["product"][-1] == "streetlight model ALR-SL-90W"
+        assert sheet_columns["quantity"][-1] == "120 pcs"
+        assert sheet_columns["contact_person"][-1] == "Eng. Omar"
+        assert sheet_columns["contact_email"][-1] == "omar@client.com"
+        print("✅ Sheets row verified.")
 
     # Verify Salesforce CRM interaction
     if settings.MOCK_SALESFORCE_ENABLED:
-        # Load the mock CRM log and check the last entry
-        import json
-        with open(salesforce_crm_service.output_file, 'r') as f:
-            crm_data = json.load(f)
-        assert len(crm_data) > 0
+        crm_data = services.salesforce_crm_service.opportunities
+        assert len(crm_data) == 1
         last_opportunity = crm_data[-1]
-        expected_opportunity_name = f"RFQ: streetlight model ALR-SL-90W from Eng. Omar"
-        assert last_opportunity["Name"] == expected_opportunity_name
+        assert last_opportunity["Name"] == "RFQ: streetlight model ALR-SL-90W from Eng. Omar"
+        assert last_opportunity["Description"] == (
+            "RFQ for 120 pcs streetlight model ALR-SL-90W. Needed in Dammam within 4 weeks. Contact: omar@client.com"
+        )
         assert "Qualification" in last_opportunity["StageName"]
-        print(f"✅ CRM opportunity verified in {salesforce_crm_service.output_file}.")
+        print("✅ CRM opportunity verified.")
 
     # Verify Google Drive attachment archiving
     if settings.MOCK_GOOGLE_DRIVE_ENABLED:
         today_folder = f"RFQ_{datetime.date.today().isoformat()}"
-        archived_path = os.path.join(google_drive_service.get_mock_folder_path(), today_folder, "specs.pdf")
-        assert os.path.exists(archived_path)
-        with open(archived_path, 'rb') as f:
-            content = f.read()
-        assert content == test_attachment_content
-        print(f"✅ Archived attachment verified in {archived_path}.")
+        archived_path = os.path.join(services.google_drive_service.get_mock_folder_path(), today_folder, "specs.pdf")
+        assert services.google_drive_service.files[archived_path] == TEST_ATTACHMENT_CONTENT
+        print(f"✅ Archived attachment verified at {archived_path}.")
 
     # Verify Email Sender auto-reply
     if settings.MOCK_EMAIL_SENDER_ENABLED:
-        with open(email_sender_service.output_file, 'r') as f:
-            email_content = f.read()
-        assert "To: omar@client.com" in email_content
-        assert f"Subject: Re: {test_subject}" in email_content
-        assert "Hello Eng. Omar" in email_content # Assert personalized greeting
-        assert "inquiry regarding streetlight model ALR-SL-90W" in email_content # Assert product name
-        print(f"✅ Auto-reply sample verified in {email_sender_service.output_file}.")
+        last_email = services.email_sender_service.sent_emails[-1]
+        assert last_email["recipient"] == "omar@client.com"
+        assert last_email["subject"] == f"Re: {TEST_SUBJECT}"
+        # The English reply is the one sent, with the personalized greeting and product name
+        assert last_email["body"] == (
+            "Hello Eng. Omar,\n\n"
+            "Thank you for your inquiry regarding streetlight model ALR-SL-90W. "
+            "We have received your request and will get back to you shortly.\n\n"
+            "Best regards,\nAlrouf Team\n"
+        )
+        print("✅ Auto-reply verified.")
 
     # Verify Alert Sender internal alert
     if settings.MOCK_ALERT_SENDER_ENABLED:
-        with open(alert_sender_service.output_file, 'r') as f:
-            alert_content = f.read()
-        assert "New RFQ received: 'RFQ — Streetlight Poles' from omar@client.com." in alert_content
-        assert "Fields extracted: streetlight model ALR-SL-90W, 120 pcs." in alert_content
-        assert "#rfq_alerts" in alert_content
-        print(f"✅ Internal alert verified in {alert_sender_service.output_file}.")
+        last_alert = services.alert_sender_service.alerts[-1]
+        assert "New RFQ received: 'RFQ — Streetlight Poles' from omar@client.com." in last_alert
+        assert "Fields extracted: streetlight model ALR-SL-90W, 120 pcs." in last_alert
+        assert "#rfq_alerts" in last_alert
+        print("✅ Internal alert verified.")
+
+
+def test_failed_side_effect_does_not_stop_the_others(services, monkeypatch, caplog):
+    """
+    Tests that one failing RFQ side effect is logged while the other side effects still run.
+    """
+    async def failing_create_opportunity(self, opportunity_data):
+        raise RuntimeError("CRM unavailable")
+    # The mocks use __slots__, so the method is replaced on the class
+    monkeypatch.setattr(MockSalesforceCRMService, "create_opportunity", failing_create_opportunity)
+
+    asyncio.run(rfq.process_rfq_email(create_rfq_email()))
+
+    assert "RFQ side effect failed: Salesforce opportunity" in caplog.text
+    assert services.salesforce_crm_service.opportunities == []
+    assert services.google_sheets_service.num_rows == 1
+    assert len(services.google_drive_service.files) == 1
+    assert len(services.email_sender_service.sent_emails) == 1
+    assert len(services.alert_sender_service.alerts) == 1
+
+
+def test_attachments_are_archived_on_the_io_pool(services, monkeypatch):
+    """
+    Tests that attachments are decoded and archived on the shared I/O thread pool.
+    """
+    archive_threads = []
+    archive_attachment = MockGoogleDriveService.archive_attachment
+    def recording_archive_attachment(self, *args, **kwargs):
+        archive_threads.append(threading.current_thread().name)
+        return archive_attachment(self, *args, **kwargs)
+    monkeypatch.setattr(MockGoogleDriveService, "archive_attachment", recording_archive_attachment)
+
+    asyncio.run(rfq.process_rfq_email(create_rfq_email()))
+
+    assert len(archive_threads) == 1
+    assert archive_threads[0].startswith("rfq-io")
+    assert rfq.get_io_pool()._max_workers == settings.IO_THREAD_POOL_SIZE
+
+
+class FixedDateTime(datetime.datetime):
+    """A datetime whose now() is one second before midnight at the end of January."""
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 1, 31, 23, 59, 59)
+
+@pytest.fixture
+def fixed_clock(monkeypatch):
+    """Freezes the clock seen by `process_rfq_email`."""
+    monkeypatch.setattr(rfq, "datetime", types.SimpleNamespace(
+        datetime=FixedDateTime, date=datetime.date, timedelta=datetime.timedelta
+    ))
+
+
+def test_rfq_dates_derive_from_one_clock_reading(services, fixed_clock):
+    """
+    Tests that the sheet timestamp, CRM close date and Drive folder all come from the same reading.
+    """
+    asyncio.run(rfq.process_rfq_email(create_rfq_email()))
+
+    assert services.google_sheets_service.columns["Timestamp"][-1] == "2026-01-31T23:59:59"
+    assert services.salesforce_crm_service.opportunities[-1]["CloseDate"] == "2026-02-28"
+    archived_path = os.path.join(services.google_drive_service.get_mock_folder_path(), "RFQ_2026-01-31", "specs.pdf")
+    assert services.google_drive_service.files[archived_path] == TEST_ATTACHMENT_CONTENT
+
+
+def test_rfq_dates_are_computed_once_per_day(services, fixed_clock, monkeypatch):
+    """
+    Tests that the RFQ date strings are reused within a day and recomputed on the next one.
+    """
+    rfq._rfq_dates.cache_clear()
+    asyncio.run(rfq.process_rfq_email(create_rfq_email()))
+    asyncio.run(rfq.process_rfq_email(create_rfq_email()))
+    assert rfq._rfq_dates.cache_info().misses == 1
+    assert rfq._rfq_dates.cache_info().hits == 1
+
+    # The cache turns over when the date changes
+    monkeypatch.setattr(FixedDateTime, "now", classmethod(lambda cls, tz=None: cls(2026, 2, 1, 0, 0, 1)))
+    asyncio.run(rfq.process_rfq_email(create_rfq_email()))
+    assert rfq._rfq_dates.cache_info().misses == 2
+    close_dates = [opportunity["CloseDate"] for opportunity in services.salesforce_crm_service.opportunities]
+    assert close_dates == ["2026-02-28", "2026-02-28", "2026-03-01"]
 
+
+def test_auto_reply_defaults_for_missing_fields(services, monkeypatch):
+    """
+    Tests that the auto-reply falls back to the default greeting and product wording.
+    """
+    monkeypatch.setattr(MockLLMService, "extract_fields", lambda self, subject, body: {"contact_email": "buyer@client.com"})
+
+    asyncio.run(rfq.process_rfq_email(create_rfq_email(subject="Quotation request", body="Please send prices.")))
+
+    assert len(services.email_sender_service.sent_emails) == 1
+    reply_body = services.email_sender_service.sent_emails[-1]["body"]
+    assert reply_body.startswith("Hello Valued Client,\n\nThank you for your inquiry regarding your request.")
+
+
+def test_crm_opportunity_defaults_for_missing_fields(services, monkeypatch):
+    """
+    Tests the CRM opportunity name fallbacks and the blank description fields for a sparse extraction.
+    """
+    monkeypatch.setattr(MockLLMService, "extract_fields", lambda self, subject, body: {"quantity": "5 pcs"})
+
+    asyncio.run(rfq.process_rfq_email(create_rfq_email(subject="Quotation request", body="Please send prices.")))
+
+    opportunity = services.salesforce_crm_service.opportunities[-1]
+    assert opportunity["Name"] == "RFQ: Unknown Product from Unknown Client"
+    assert opportunity["Description"] == "RFQ for 5 pcs . Needed in  within . Contact: "
+
+
+def test_alert_writer_survives_a_failed_write(tmp_path, monkeypatch, caplog):
+    """
+    Tests that a failed alert write is logged and the background writer keeps draining.
+    """
+    failures = [OSError("disk full")]
+    write_batch = MockAlertSenderService._write_batch
+    def flaky_write_batch(self, lines):
+        if failures:
+            raise failures.pop()
+        write_batch(self, lines)
+    monkeypatch.setattr(MockAlertSenderService, "_write_batch", flaky_write_batch)
+    output_file = tmp_path / "alerts.txt"
+    alert_sender_service = MockAlertSenderService(output_file=str(output_file))
+
+    async def send_alerts():
+        await alert_sender_service.send_alert("lost", channel="#rfq_alerts")
+        await alert_sender_service.flush()
+        await alert_sender_service.send_alert("kept", channel="#rfq_alerts")
+        await alert_sender_service.aclose()
+    asyncio.run(send_alerts())
+
+    assert "Failed to write 1 alert(s)" in caplog.text
+    assert "disk full" in caplog.text
+    lines = output_file.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1 and lines[0].endswith("kept")
+
+
+def test_parse_email_finds_nested_attachments():
+    """
+    Tests that attachments inside forwarded messages and nested multiparts are found.
+    """
+    from email.message import EmailMessage
+    email_parser = EmailParser()
+
+    forwarded = EmailMessage()
+    forwarded["Subject"] = "RFQ"
+    forwarded.set_content("Original request.")
+    forwarded.add_attachment(b"%PDF rfq", maintype="application", subtype="pdf", filename="rfq.pdf")
+    outer = EmailMessage()
+    outer["Subject"] = "Fwd: RFQ"
+    outer.set_content("See the forwarded request.")
+    outer.add_attachment(forwarded)
+    parsed = email_parser.parse_email(outer.as_bytes())
+    assert [attachment.filename for attachment in parsed["attachments"]] == ["rfq.pdf"]
+    assert parsed["attachments"][0].payload == b"%PDF rfq"
+
+    inner = EmailMessage()
+    inner.set_content("Inner body.")
+    inner.add_attachment(b"%PDF a", maintype="application", subtype="pdf", filename="a.pdf")
+    outer = EmailMessage()
+    outer["Subject"] = "Nested"
+    outer.set_content("Outer body.")
+    outer.make_mixed()
+    outer.attach(inner)
+    parsed = email_parser.parse_email(outer.as_bytes())
+    assert [attachment.filename for attachment in parsed["attachments"]] == ["a.pdf"]
+    assert parsed["body_plain"].strip() == "Outer body."
+
+
+def test_attachment_stream_decodes_base64_in_blocks():
+    """
+    Tests that an attachment stream yields the decoded content, and that `payload` is decoded once.
+    """
+    email_parser = EmailParser()
+    content = os.urandom(300_001) # Spans several decode blocks and ends on a partial quantum
+    raw_email = email_parser.create_mock_email("Specs", "See attached.", attachments=[("specs.pdf", content)])
+    attachment = email_parser.parse_email(raw_email)["attachments"][0]
+
+    with attachment.open() as stream:
+        chunks = iter(lambda: stream.read(4096), b"")
+        assert b"".join(chunks) == content
+    with attachment.open() as stream:
+        assert stream.read() == content
+    assert attachment.payload is attachment["payload"]
+    assert attachment.payload == content
+
+
+def test_now_iso_follows_a_clock_stepped_backwards(monkeypatch):
+    """
+    Tests that the cached timestamp follows the wall clock when it steps backwards.
+    """
+    from mocks import mock_utils
+    clock = iter([1_800_000_000.0, 1_800_000_000.0004, 1_799_999_000.0])
+    monkeypatch.setattr(mock_utils, "time", types.SimpleNamespace(time=lambda: next(clock)))
+    first = mock_utils.now_iso()
+    assert mock_utils.now_iso() == first # Same millisecond: cached
+    assert mock_utils.now_iso() == datetime.datetime.fromtimestamp(1_799_999_000.0).isoformat()
@@ -1,5 +1,10 @@
+import asyncio
+import json
+import random
+import pytest
+from types import SimpleNamespace
 from fastapi.testclient import TestClient
-from unittest.mock import patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 # Patch config for testing to ensure mock LLM is used
 @patch('src.config.USE_MOCK_LLM', True)
@@ -7,7 +12,6 @@ from unittest.mock import patch
 def test_create_quote_success():
     # ✅ Import AFTER patches are applied
     from src.app import app
-    client = TestClient(app)
     request_payload = {
         "client": {"name": "Gulf Eng.", "contact": "omar@client.com", "lang": "en"},
         "currency": "SAR",
@@ -19,8 +23,13 @@ def test_create_quote_success():
         "notes": "Client asked for spec compliance with Tarsheed."
     }
 
-    response = client.post("/quote", json=request_payload)
+    # Use the client as a context manager so the app lifespan creates the LLM service
+    with TestClient(app) as client:
+        response = client.post("/quote", json=request_payload)
     assert response.status_code == 200
+    # orjson writes non-ASCII text as raw UTF-8 rather than \uXXXX escapes
+    assert "استجابة".encode("utf-8") in response.content
+    assert b"\\u" not in response.content
     response_data = response.json()
 
     # Test calculations
@@ -63,7 +72,6 @@ def test_create_quote_success():
 def test_create_quote_empty_items():
     # FIX: Corrected import path for app
     from src.app import app
-    client = TestClient(app)
     request_payload = {
         "client": {"name": "Test Client", "contact": "test@client.com", "lang": "en"},
         "currency": "USD",
@@ -71,12 +79,122 @@ def test_create_quote_empty_items():
         "delivery_terms": "FOB Port",
         "notes": ""
     }
-    response = client.post("/quote", json=request_payload)
+    # Use the client as a context manager so the app lifespan creates the LLM service
+    with TestClient(app) as client:
+        response = client.post("/quote", json=request_payload)
     assert response.status_code == 200
     response_data = response.json()
     assert response_data["grand_total"] == 0.0
     assert len(response_data["line_items"]) == 0
-    # For empty items, the mock LLM response will still be bilingual
-    assert "Mock LLM response for English" in response_data["email_draft_en"]
-    assert "استجابة نموذج اللغة الكبيرة الوهمية للغة العربية" in response_data["email_draft_en"] # Also check for Arabic part
+    # Empty quotes get static drafts instead of an LLM response
+    assert "Mock LLM response" not in response_data["email_draft_en"]
+    assert "Dear Test Client," in response_data["email_draft_en"]
+    assert "did not include any line items" in response_data["email_draft_en"]
+    assert "FOB Port" in response_data["email_draft_ar"]
+
+
+@patch('src.config.USE_MOCK_LLM', True)
+@patch('src.config.OPENAI_API_KEY', None)
+def test_create_quote_batch():
+    from src.app import app
+    request_payload = [
+        {
+            "client": {"name": "Gulf Eng.", "contact": "omar@client.com", "lang": "en"},
+            "currency": "SAR",
+            "items": [{"sku": "ALR-SL-90W", "qty": 120, "unit_cost": 240.0, "margin_pct": 22}],
+            "delivery_terms": "DAP Dammam, 4 weeks",
+            "notes": "Client asked for spec compliance with Tarsheed."
+        },
+        {
+            "client": {"name": "Test Client", "contact": "test@client.com", "lang": "en"},
+            "currency": "USD",
+            "items": [],
+            "delivery_terms": "FOB Port",
+            "notes": ""
+        },
+    ]
+    with TestClient(app) as client:
+        response = client.post("/quote/batch", json=request_payload)
+    assert response.status_code == 200
+    response_data = response.json()
+    # Responses come back in request order
+    assert [quote["client_name"] for quote in response_data] == ["Gulf Eng.", "Test Client"]
+    assert response_data[0]["grand_total"] == 35136.0
+    assert "35136.00 SAR" in response_data[0]["email_draft_en"]
+    assert response_data[1]["grand_total"] == 0.0
+    assert "FOB Port" in response_data[1]["email_draft_ar"]
+
+
+def test_batch_prices_match_scalar_helper():
+    from src.app import LineItem, calculate_line_item_prices, calculate_line_item_prices_batch
+    rng = random.Random(42)
+    items = [
+        LineItem(
+            sku=f"SKU-{i}",
+            qty=rng.randint(1, 1000),
+            unit_cost=round(rng.uniform(0.5, 5000), rng.choice([1, 2])),
+            margin_pct=round(rng.uniform(0, 100), rng.choice([0, 1, 2, 3])),
+        )
+        for i in range(5000)
+    ]
+    # 672.2 * 1.175 * 431 rounds to .89 with Python's round but to .88 with np.round
+    items.append(LineItem(sku="EDGE", qty=431, unit_cost=672.2, margin_pct=17.5))
+    prices_per_unit, prices_per_line = calculate_line_item_prices_batch(items)
+    assert list(zip(prices_per_unit, prices_per_line)) == [calculate_line_item_prices(item) for item in items]
+
+
+@patch('src.config.USE_MOCK_LLM', True)
+@patch('src.config.OPENAI_API_KEY', None)
+def test_create_quote_batch_rejects_oversized_batch():
+    from src.app import app
+    from src.config import MAX_QUOTE_BATCH
+    quote = {
+        "client": {"name": "Test Client", "contact": "test@client.com", "lang": "en"},
+        "currency": "USD",
+        "items": [],
+    }
+    with TestClient(app) as client:
+        response = client.post("/quote/batch", json=[quote] * (MAX_QUOTE_BATCH + 1))
+    assert response.status_code == 422
+
+
+def test_generate_email_drafts_offline(caplog):
+    from src.services import llm_utils
+
+    with patch.object(llm_utils, 'USE_MOCK_LLM', True):
+        service = llm_utils.LLMService()
+    summary_data = {
+        "client_name": "Gulf Eng.", "currency": "SAR", "grand_total": 35136.0,
+        "delivery_terms": "DAP Dammam, 4 weeks", "notes": "No specific notes.",
+    }
+    requests = [("English", summary_data), ("Arabic", summary_data), ("English", summary_data)]
+
+    def result_line(custom_id, status_code, content=None, error=None):
+        body = {"choices": [{"message": {"content": content}}]} if content else {}
+        return json.dumps({"custom_id": str(custom_id), "response": {"status_code": status_code, "body": body}, "error": error})
+
+    def batch_client(output, errors):
+        client = MagicMock()
+        client.files.create = AsyncMock(return_value=SimpleNamespace(id="file-in"))
+        client.batches.create = AsyncMock(return_value=SimpleNamespace(
+            id="batch-1", status="completed", output_file_id="file-out", error_file_id="file-err" if errors else None
+        ))
+        files = {"file-out": "\n".join(output), "file-err": "\n".join(errors)}
+        client.files.content = AsyncMock(side_effect=lambda file_id: SimpleNamespace(text=files[file_id]))
+        return client
+
+    # Results come back out of order and are matched to requests by custom_id
+    service.client = batch_client([result_line(2, 200, "draft 2"), result_line(0, 200, "draft 0"), result_line(1, 200, "draft 1")], [])
+    with patch.object(llm_utils, 'USE_MOCK_LLM', False):
+        drafts = asyncio.run(service.generate_email_drafts_offline(requests))
+    assert drafts == ["draft 0", "draft 1", "draft 2"]
+    uploaded = service.client.files.create.await_args.kwargs["file"][1].decode("utf-8").splitlines()
+    assert [json.loads(line)["custom_id"] for line in uploaded] == ["0", "1", "2"]
+
+    # A failed request and a missing result are logged and raised instead of returned as empty drafts
+    service.client = batch_client([result_line(0, 200, "draft 0")], [result_line(1, 500, error={"message": "server error"})])
+    with patch.object(llm_utils, 'USE_MOCK_LLM', False), pytest.raises(RuntimeError, match="2 of 3 email drafts failed"):
+        asyncio.run(service.generate_email_drafts_offline(requests))
+    assert "Email draft 1 of OpenAI batch batch-1 failed: {'message': 'server error'}" in caplog.text
+    assert "Email draft 2 of OpenAI batch batch-1 failed: no result in the batch output" in caplog.text
 